@@ -13,11 +13,94 @@ import json
 import time
 import sys
 import logging
-from logging.handlers import RotatingFileHandler
+import bisect
+import mmap
+import asyncio
+import contextlib
+import argparse
+import threading
+import atexit
+import queue
+import multiprocessing
+import hashlib
+import itertools
+from collections import deque, defaultdict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import requests
-from pathlib import Path
-from typing import List, Dict, Optional, Set
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import List, Dict, Optional, Set, FrozenSet, Pattern, Tuple, Union, Iterator, Match
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import hyperscan  # 可选依赖：多模式单遍扫描引擎
+except ImportError:
+    hyperscan = None
+
+try:
+    import regex  # 可选依赖：增强正则引擎，合并正则改用regex编译，嵌套量词等病态特征的回溯开销更小
+except ImportError:
+    regex = None
+
+try:
+    import httpx  # 可选依赖：异步HTTP客户端，外部JS并发下载走单个事件循环
+    try:
+        import h2  # httpx启用HTTP/2所需
+        _HTTP2_ENABLED = True
+    except ImportError:
+        _HTTP2_ENABLED = False
+except ImportError:
+    httpx = None
+    _HTTP2_ENABLED = False
+
+try:
+    import requests_cache  # 可选依赖：HTTP响应持久化到本地SQLite，重复爬取同一站点时直接命中缓存
+except ImportError:
+    requests_cache = None
+
+try:
+    import orjson  # 可选依赖：C实现的JSON库，规则库与结果文件的解析、序列化更快
+except ImportError:
+    orjson = None
+
+try:
+    import lxml  # 可选依赖：C实现的HTML解析器，比内置html.parser快数倍
+    _HTML_PARSER = "lxml"
+except ImportError:
+    _HTML_PARSER = "html.parser"
+
+try:
+    import numpy  # 可选依赖：向量化查找换行符位置，大文件行号计算不再逐个调用find
+except ImportError:
+    numpy = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser  # 可选依赖：基于lexbor的HTML解析器，只抽取<script>时比BeautifulSoup快一个数量级
+except ImportError:
+    LexborHTMLParser = None
+
+_SCRIPT_STRAINER = SoupStrainer('script')  # 解析HTML时只构建<script>节点，跳过其余文档树
+
+
+def _json_loads(data: Union[str, bytes]):
+    """解析JSON（安装了orjson时使用orjson；两者的解析错误均为json.JSONDecodeError）"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(obj) -> bytes:
+    """序列化为UTF-8编码、缩进2空格的JSON（非ASCII字符原样保留）"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+if os.name == 'nt':
+    os.system('')  # 让Windows控制台启用ANSI转义序列（颜色与清屏均依赖它）
 
 
 # 颜色控制常量（ANSI 转义序列）
@@ -34,24 +117,152 @@ class Color:
 
 
 class JSEncryptionDetector:
-    def __init__(self):
+    _log_pid: Optional[int] = None  # 创建日志后台写入线程的进程ID
+    # 单行注释与多行注释合并为一个正则，一次遍历完成移除；
+    # 多行注释用展开循环写法 /\*[^*]*\*+(?:[^/*][^*]*\*+)*/，贪婪跳过非*字符，不再逐字符尝试非贪婪匹配
+    _COMMENT_RE = re.compile(r"//[^\n]*|/\*[^*]*\*+(?:[^/*][^*]*\*+)*/")
+    _COMMENT_RE_BYTES = re.compile(rb"//[^\n]*|/\*[^*]*\*+(?:[^/*][^*]*\*+)*/")
+    # 扩展名不是.html/.htm的文件，开头（跳过BOM与空白）是HTML标记时按HTML处理；JS代码不会以<开头
+    _HTML_SNIFF_RE = re.compile(rb"(?:\xef\xbb\xbf)?\s*(?:<!doctype\s+html|<html|<script)", re.IGNORECASE)
+    _HTML_SNIFF_SIZE = 512
+    # 字节模式正则的\b、\w、\s与忽略大小写只认ASCII（\s也不含\x1c-\x1f），代码含这些字符以外的内容时按文本扫描
+    _BYTE_UNSAFE_RE = re.compile(rb"[\x1c-\x1f\x80-\xff]")
+    _TEXT_CTRL_RE = re.compile(r"[\x1c-\x1f]")
+    _KEY_FILE_RE = re.compile(r'key(_\d+)?\.json')  # 检测结果文件名（key.json、key_1.json ...）
+    _CRAWL_WORKERS = 20  # 未安装httpx时并发下载的线程数
+    _POOL_HOSTS = 32  # 连接池缓存的主机数（外部JS常分布在多个CDN域名上）
+    _ASYNC_FETCH_LIMIT = 50  # 异步下载的最大并发请求数（与httpx连接池大小一致）
+    _MAX_FETCH_BYTES = 8 * 1024 * 1024  # 单个页面/JS最多读取的字节数，超出部分丢弃
+    _FETCH_CHUNK_SIZE = 65536  # 流式下载的分块大小
+    _CACHE_BUST_PARAMS = frozenset({'v', 't', 'ts', '_'})  # 去重时忽略的防缓存查询参数（?v=1.2、?_=时间戳等）
+    _FETCH_CACHE_SIZE = 256  # 会话内按URL缓存的响应数量上限（仅缓存带ETag/Last-Modified的响应）
+    _FETCH_CACHE_BYTES = 64 * 1024 * 1024  # 会话内缓存的响应内容总字节数上限，超出时淘汰最久未使用的URL
+    _FETCH_CACHE_ENTRY_BYTES = 4 * 1024 * 1024  # 超过此大小的响应不缓存，避免少数大文件挤占整个缓存
+    _SOURCE_EXTENSIONS = ('.js', '.mjs', '.cjs', '.jsx', '.ts', '.tsx', '.vue', '.html', '.htm')  # 目录检测收集的文件类型
+    _MAX_DIR_FILE_BYTES = 10 * 1024 * 1024  # 目录检测跳过超过此大小的文件（多为日志、数据文件而非源码）
+    _MMAP_MIN_BYTES = 1024 * 1024  # 不小于此大小的文件才用mmap映射，更小的文件直接读入
+    _BINARY_SNIFF_SIZE = 4096  # 检查文件开头这么多字节中是否含NUL，含NUL视为二进制文件跳过
+    _PROGRESS_UPDATES = 100  # 目录检测进度最多刷新的次数（约每1%一次），避免每个文件都写一次终端
+    _LOG_EVERY_FILES = 100  # 目录检测时每处理这么多文件记录一次汇总日志（逐文件日志降为DEBUG级别）
+    _PARALLEL_MIN_FILES = 8  # 文件数少于此值时直接单进程检测，省去进程池启动与规则重复编译的开销
+    _HTTP_CACHE_NAME = "http_cache"  # requests_cache的SQLite缓存文件名（与debug.log同在当前目录；只用于requests下载路径，httpx不经过该缓存）
+    _HTTP_CACHE_EXPIRE = 3600  # HTTP缓存有效期（秒）
+    _USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
+    _BACKREF_RE = re.compile(r"\\[1-9]")  # 数字反向引用在合并正则后组号会错位
+    # re是回溯引擎且无超时，超大输入按窗口分段匹配，限制单次匹配可回溯的范围（Hyperscan为线性扫描，不分段）
+    _MAX_SCAN_CHARS = 10 * 1024 * 1024
+    _SCAN_WINDOW = 1024 * 1024
+    _WINDOW_OVERLAP = 4096
+    _INLINE_FLAGS_RE = re.compile(r"\?[aiLmsux-]+(?::.*)?", re.DOTALL)  # 内联标志分组 (?x) / (?x:...) 的内容
+    _LITERAL_ALTS_RE = re.compile(r"[\w\-]+(?:\|[\w\-]+)*")  # 纯字面量分支分组 (a|b) 的内容
+    _QUANTIFIER_RE = re.compile(r"\{(?:\d+|\d*,\d*)\}")  # re视为量词的 {m} {m,n} {,n} {m,}，其余 { 为字面量
+    _MIN_LITERAL_LEN = 3  # 预筛字面量的最短长度，过短的字面量几乎总会出现，筛选无意义
+    _DOTTED_I_FOLD = {0x130: 'i', 0x131: 'i'}  # İ、ı 在忽略大小写时与i相匹配
+    _UNION_CACHE_SIZE = 256  # 按算法子集缓存的合并正则数量上限
+    _NUMPY_MIN_SIZE = 64 * 1024  # 小于此长度的代码直接用find定位换行符
+    _NUMPY_SAMPLE_SIZE = 64 * 1024  # 估算行密度时取样的长度
+    _NUMPY_MAX_LINE_LEN = 128  # 平均行长不超过此值时用numpy定位换行符
+    REGEX_ENGINES = ("auto", "re", "hyperscan")  # auto：已安装hyperscan时优先使用，否则使用re
+
+    def __init__(self, algorithms: Optional[Dict[str, List[str]]] = None, regex_engine: str = "auto",
+                 log_queue: Optional["multiprocessing.Queue"] = None):
         self.algorithms: Dict[str, List[str]] = {}  # 加载的特征库
         self.loaded_rules_path: Optional[str] = None  # 当前加载的规则文件路径
-        self.session = requests.Session()
-        self.session.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
-        }
-        self._init_logger()  # 初始化日志系统
-        self._load_default_rules()  # 初始加载默认规则
+        self._compiled: Dict[str, List[Pattern]] = {}  # 预编译的特征正则（随规则变更重建）
+        self._compiled_bytes: Optional[Dict[str, List[Pattern]]] = None  # 字节模式特征正则（用于mmap扫描）
+        self._alg_groups: Dict[str, List[Tuple[str, str]]] = {}  # 算法名 -> [(合并正则分组名, 特征)]
+        self._group_alg: Dict[str, str] = {}  # 合并正则的分组名 -> 算法名
+        # 按 (参与的算法集合, 是否字节模式, 是否允许regex编译) 缓存的合并正则（无法合并时为None）
+        self._union_cache: Dict[Tuple[FrozenSet[str], bool, bool], Optional[Pattern]] = {}
+        self._alg_literals: Dict[str, Optional[Set[str]]] = {}  # 算法名 -> 必现字面量（小写），None表示无法预筛
+        self._alg_literals_bytes: Dict[str, Optional[Set[bytes]]] = {}
+        self._hs_db = None  # Hyperscan特征数据库（未安装hyperscan时为None）
+        self._hs_ids: List[Tuple[str, str]] = []  # Hyperscan表达式ID -> (算法名, 特征)
+        self._hs_local = threading.local()  # 每个线程独立的Hyperscan scratch（scratch不可跨线程并发使用）
+        # 外部JS内容的SHA-1 -> 检测结果：同一份JS出现在多个URL（CDN镜像、带不同查询参数）时只扫描一次
+        self._content_cache: Dict[str, List[Dict]] = {}
+        # URL -> (ETag, Last-Modified, 响应内容)：同一会话内重复爬取时发送条件请求，304时直接使用缓存内容
+        # 按最近使用顺序排列（最久未使用的在前），总字节数受_FETCH_CACHE_BYTES限制；requests线程池并发读写，需加锁
+        self._fetch_cache: Dict[str, Tuple[Optional[str], Optional[str], bytes]] = {}
+        self._fetch_cache_bytes = 0
+        self._fetch_cache_lock = threading.Lock()
+        # 限流与服务端临时错误按退避重试。该Retry只挂在requests的HTTPAdapter上，
+        # httpx的传输层只重试连接错误，状态码重试由_fetch_url_async按同一配置实现
+        self._retry = Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+        # requests会话在首次下载时才创建：目录检测的工作进程只扫描本地文件，不必建立连接池与HTTP缓存
+        self._session: Optional[requests.Session] = None
+        self._session_lock = threading.Lock()
+        self._init_logger(log_queue)  # 初始化日志系统
+        if regex_engine not in self.REGEX_ENGINES:
+            raise ValueError(f"未知的正则引擎: {regex_engine}，可选: {', '.join(self.REGEX_ENGINES)}")
+        if regex_engine == "hyperscan" and hyperscan is None:
+            self.print_color("⚠️ 未安装hyperscan，使用re引擎", Color.YELLOW)
+            self.logger.warning("指定了hyperscan引擎但未安装hyperscan，使用re引擎")
+            regex_engine = "re"
+        self.regex_engine = regex_engine  # 多模式扫描引擎
+        if algorithms is None:
+            self._load_default_rules()  # 初始加载默认规则
+        else:
+            self.algorithms = algorithms  # 直接使用传入的特征库（如多进程工作进程）
+            self._compile_rules()
         self.current_detection_results: List[Dict] = []  # 存储当前检测结果
 
+    @property
+    def session(self) -> requests.Session:
+        """下载用的requests会话（首次访问时创建；requests线程池可能并发访问，需加锁）"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self._build_session()
+        return self._session
+
+    def _build_session(self) -> requests.Session:
+        """创建requests会话：安装了requests_cache时使用SQLite持久化缓存"""
+        if requests_cache is not None:
+            session = requests_cache.CachedSession(
+                self._HTTP_CACHE_NAME, backend='sqlite', expire_after=self._HTTP_CACHE_EXPIRE
+            )
+        else:
+            session = requests.Session()
+        # 使用update保留requests默认的Accept-Encoding（gzip/deflate等压缩传输）
+        session.headers.update({"User-Agent": self._USER_AGENT})
+        # 每个主机的连接数与并发下载线程数一致，保证并发请求复用keep-alive连接
+        adapter = HTTPAdapter(
+            pool_connections=self._POOL_HOSTS,
+            pool_maxsize=self._CRAWL_WORKERS,
+            max_retries=self._retry
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        atexit.register(session.close)  # 退出时关闭连接池
+        return session
+
     # ------------------------------
     # 日志系统初始化
     # ------------------------------
-    def _init_logger(self) -> None:
-        """初始化日志系统，同时输出到控制台和文件"""
+    def _init_logger(self, log_queue: Optional["multiprocessing.Queue"] = None) -> None:
+        """初始化日志系统，同时输出到控制台和文件
+
+        log_queue不为空时（多进程工作进程）日志只写入该跨进程队列，由主进程的QueueListener统一输出，
+        工作进程不创建文件处理器，避免多个进程各自轮转同一个debug.log。
+        """
         self.logger = logging.getLogger("JSEncryptionDetector")
         self.logger.setLevel(logging.DEBUG)
+        if log_queue is not None:
+            # fork出的工作进程会继承主进程的处理器，先全部移除
+            for handler in list(self.logger.handlers):
+                self.logger.removeHandler(handler)
+            self.logger.addHandler(QueueHandler(log_queue))
+            JSEncryptionDetector._log_pid = os.getpid()
+            return
+        forked = False
+        if self.logger.handlers:
+            if JSEncryptionDetector._log_pid == os.getpid():  # 已初始化过（多个实例），避免重复输出
+                return
+            # fork出的工作进程继承了QueueHandler，但后台写入线程不会随fork复制，需重新初始化
+            for handler in list(self.logger.handlers):
+                self.logger.removeHandler(handler)
+            forked = True
         
         # 日志格式
         formatter = logging.Formatter(
@@ -74,15 +285,30 @@ class JSEncryptionDetector:
         file_handler.setLevel(logging.DEBUG)
         file_handler.setFormatter(formatter)
         
+        # 文件写入交给后台线程：检测过程中的日志调用只需入队，不再同步等待磁盘IO；
+        # 控制台处理器保持同步输出，与print输出的界面信息顺序一致
+        log_queue = queue.Queue(-1)
+        listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)  # 退出前写完队列中剩余的日志
+        JSEncryptionDetector._log_pid = os.getpid()
+
         # 添加处理器
         self.logger.addHandler(console_handler)
-        self.logger.addHandler(file_handler)
+        self.logger.addHandler(QueueHandler(log_queue))
         
-        self.logger.info("日志系统初始化完成")
+        if not forked:
+            self.logger.info("日志系统初始化完成")
 
     # ------------------------------
     # 工具方法
     # ------------------------------
+    @staticmethod
+    def _clear_screen() -> None:
+        """用ANSI转义序列清屏并将光标移到左上角，无需每次启动cls/clear子进程"""
+        sys.stdout.write("\033[2J\033[H")
+        sys.stdout.flush()
+
     @staticmethod
     def print_color(text: str, color: str = Color.WHITE, bold: bool = False) -> None:
         """带颜色的打印"""
@@ -170,16 +396,17 @@ class JSEncryptionDetector:
                 "DES": [r"\bdes\b", r"createCipher\s*\(\s*['\"]des['\"]\s*\)"]
             }
             self.loaded_rules_path = "内置默认规则"
+            self._compile_rules()
             self.print_color(f"✅ 已加载默认特征库", Color.GREEN)
             self._print_rules_stats()
             self.logger.info("成功加载默认特征库")
         except Exception as e:
             self.print_color(f"❌ 加载默认规则失败: {str(e)}", Color.RED)
-            self.logger.error(f"加载默认规则失败: {str(e)}")
+            self.logger.error("加载默认规则失败: %s", e)
 
     def load_custom_rules(self, file_path: str) -> bool:
         """加载自定义特征库（增强JSON解析错误提示）"""
-        self.logger.info(f"尝试加载自定义规则: {file_path}")
+        self.logger.info("尝试加载自定义规则: %s", file_path)
         if not os.path.isfile(file_path):
             self.print_color(f"❌ 规则文件不存在: {file_path}", Color.RED)
             return False
@@ -191,7 +418,7 @@ class JSEncryptionDetector:
 
             # 尝试解析JSON（分步处理，增强错误提示）
             try:
-                rules = json.loads(file_content)
+                rules = _json_loads(file_content)
             except json.JSONDecodeError as e:
                 # 提取错误位置附近的内容，帮助用户定位问题
                 error_context = self._get_json_error_context(file_content, e.lineno, e.colno)
@@ -199,12 +426,12 @@ class JSEncryptionDetector:
                 self.print_color(f"   错误原因: {e.msg}", Color.RED)
                 self.print_color(f"   附近内容: {error_context}", Color.RED)
                 self.print_color(f"   提示: 检查是否缺少引号、逗号或括号", Color.YELLOW)
-                self.logger.error(f"JSON解析失败: {e}，文件: {file_path}")
+                self.logger.error("JSON解析失败: %s，文件: %s", e, file_path)
                 return False
 
             # 验证规则格式
             if not self._validate_rules(rules):
-                self.logger.warning(f"规则文件格式无效: {file_path}")
+                self.logger.warning("规则文件格式无效: %s", file_path)
                 return False
 
             if not self.confirm("是否确认加载该特征库？（当前特征库将被覆盖）"):
@@ -213,38 +440,30 @@ class JSEncryptionDetector:
 
             self.algorithms = rules
             self.loaded_rules_path = file_path
+            self._compile_rules()
             self.print_color(f"✅ 成功加载自定义特征库: {file_path}", Color.GREEN)
             self._print_rules_stats()
             return True
         except Exception as e:
             self.print_color(f"❌ 加载规则失败: {str(e)}", Color.RED)
-            self.logger.error(f"加载规则失败: {str(e)}", exc_info=True)
+            self.logger.error("加载规则失败: %s", e, exc_info=True)
             return False
 
     def merge_rules(self, file_path: str) -> bool:
         """合并外部规则到当前特征库"""
-        self.logger.info(f"尝试合并规则文件: {file_path}")
+        self.logger.info("尝试合并规则文件: %s", file_path)
         if not os.path.isfile(file_path):
             self.print_color(f"❌ 规则文件不存在: {file_path}", Color.RED)
-            self.logger.error(f"规则文件不存在: {file_path}")
+            self.logger.error("规则文件不存在: %s", file_path)
             return False
 
-        if not self._view_rules_file(file_path, preview_only=True):
-            self.logger.warning(f"规则文件预览失败: {file_path}")
+        # 预览时已完成读取、解析与校验，直接复用其结果
+        new_rules = self._view_rules_file(file_path, preview_only=True)
+        if new_rules is None:
+            self.logger.warning("规则文件预览失败: %s", file_path)
             return False
 
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                new_rules = json.load(f)
-            self.logger.debug(f"成功读取待合并规则: {file_path}")
-
-            if not isinstance(new_rules, dict):
-                raise ValueError("合并的规则必须是JSON对象")
-
-            if not self._validate_rules(new_rules):
-                self.logger.warning(f"待合并规则格式无效: {file_path}")
-                return False
-
             if not self.confirm("是否确认合并该特征库？"):
                 self.print_color("⚠️ 已取消合并", Color.YELLOW)
                 self.logger.info("用户取消合并规则")
@@ -256,29 +475,30 @@ class JSEncryptionDetector:
             for alg, patterns in new_rules.items():
                 if alg in self.algorithms:
                     original_count = len(self.algorithms[alg])
-                    self.algorithms[alg].extend(patterns)
-                    self.algorithms[alg] = list(set(self.algorithms[alg]))
+                    # dict.fromkeys一次线性去重并保持原有顺序（set会打乱特征顺序）
+                    self.algorithms[alg] = list(dict.fromkeys(self.algorithms[alg] + patterns))
                     new_count = len(self.algorithms[alg])
                     self.print_color(f"  算法 {alg}: 合并前 {original_count} 个特征，合并后 {new_count} 个特征（去重 {original_count + len(patterns) - new_count} 个）", Color.BLUE)
-                    self.logger.debug(f"合并算法 {alg}: 原{original_count}个，新增{len(patterns)}个，去重后{new_count}个")
+                    self.logger.debug("合并算法 %s: 原%s个，新增%s个，去重后%s个", alg, original_count, len(patterns), new_count)
                 else:
                     self.algorithms[alg] = patterns
                     self.print_color(f"  新增算法 {alg}: {len(patterns)} 个特征", Color.GREEN)
-                    self.logger.debug(f"新增算法 {alg}: {len(patterns)} 个特征")
+                    self.logger.debug("新增算法 %s: %s 个特征", alg, len(patterns))
+            self._compile_rules()
 
             self.print_color(f"\n✅ 成功合并规则: {file_path}", Color.GREEN)
             self.print_color(f"  合并前: {prev_alg_count} 个算法，{prev_pattern_count} 个特征", Color.BLUE)
             self.print_color(f"  合并后: {len(self.algorithms)} 个算法，{sum(len(p) for p in self.algorithms.values())} 个特征", Color.BLUE)
-            self.logger.info(f"成功合并规则: {file_path}")
+            self.logger.info("成功合并规则: %s", file_path)
             return True
         except Exception as e:
             self.print_color(f"❌ 合并规则失败: {str(e)}", Color.RED)
-            self.logger.error(f"合并规则失败: {str(e)}", exc_info=True)
+            self.logger.error("合并规则失败: %s", e, exc_info=True)
             return False
 
     def save_current_rules(self, output_path: str) -> bool:
         """保存当前加载的规则到文件"""
-        self.logger.info(f"尝试保存当前规则到: {output_path}")
+        self.logger.info("尝试保存当前规则到: %s", output_path)
         self._print_rules_stats()
         
         if not self.confirm(f"是否确认将当前特征库保存到 {output_path}？"):
@@ -287,14 +507,14 @@ class JSEncryptionDetector:
             return False
 
         try:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(self.algorithms, f, ensure_ascii=False, indent=2)
+            with open(output_path, 'wb') as f:
+                f.write(_json_dumps(self.algorithms))
             self.print_color(f"✅ 规则已保存至: {output_path}", Color.GREEN)
-            self.logger.info(f"规则已保存至: {output_path}")
+            self.logger.info("规则已保存至: %s", output_path)
             return True
         except Exception as e:
             self.print_color(f"❌ 保存规则失败: {str(e)}", Color.RED)
-            self.logger.error(f"保存规则失败: {str(e)}", exc_info=True)
+            self.logger.error("保存规则失败: %s", e, exc_info=True)
             return False
 
     def show_loaded_rules(self, detailed: bool = False) -> None:
@@ -315,8 +535,8 @@ class JSEncryptionDetector:
 
     def view_rules_file(self, file_path: str) -> bool:
         """查看特征库文件内容（不加载）"""
-        self.logger.info(f"查看规则文件: {file_path}")
-        return self._view_rules_file(file_path, preview_only=False)
+        self.logger.info("查看规则文件: %s", file_path)
+        return self._view_rules_file(file_path, preview_only=False) is not None
 
     # 特征库辅助方法
     def _validate_rules(self, rules: Dict[str, List[str]]) -> bool:
@@ -351,6 +571,264 @@ class JSEncryptionDetector:
                     return False
         
         return True
+
+    def _compile_rules(self) -> None:
+        """预编译当前特征库的正则表达式，避免每次检测时重复编译"""
+        # 算法名驻留后，所有检测结果共享同一个字符串对象
+        self.algorithms = {sys.intern(alg): patterns for alg, patterns in self.algorithms.items()}
+        self._compiled = {
+            alg: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+            for alg, patterns in self.algorithms.items()
+        }
+        self._alg_groups = {}
+        self._group_alg = {}
+        for alg_idx, (alg, patterns) in enumerate(self.algorithms.items()):
+            self._alg_groups[alg] = []
+            for pat_idx, pattern in enumerate(patterns):
+                name = f"a{alg_idx}_{pat_idx}"
+                self._alg_groups[alg].append((name, pattern))
+                self._group_alg[name] = alg
+        self._union_cache = {}
+        self._content_cache = {}  # 特征库变化后缓存的检测结果失效
+        self._build_literal_filter()
+        self._compiled_bytes = self._compile_bytes_patterns()
+        self.logger.debug("已预编译特征库: %s 个正则", sum(len(p) for p in self._compiled.values()))
+        self._build_hyperscan_db()
+
+    def _compile_bytes_patterns(self) -> Optional[Dict[str, List[Pattern]]]:
+        """编译字节模式特征正则（用于直接扫描mmap/下载的字节），特征库不适用字节模式时返回None"""
+        if not all(pattern.isascii() for patterns in self.algorithms.values() for pattern in patterns):
+            # 非ASCII特征在字节模式下按UTF-8字节逐个匹配，大小写折叠与字符类均会失效
+            self.logger.debug("特征库含非ASCII字符，文件将按文本读取")
+            return None
+        try:
+            return {
+                alg: [re.compile(pattern.encode('utf-8'), re.IGNORECASE) for pattern in patterns]
+                for alg, patterns in self.algorithms.items()
+            }
+        except re.error as e:
+            # 部分语法（如\uXXXX转义）在字节模式下不可用，此时按文本方式读取文件
+            self.logger.debug("特征库无法编译为字节模式，文件将按文本读取: %s", e)
+            return None
+
+    def _get_union(self, algs: FrozenSet[str], as_bytes: bool = False, use_regex: bool = True) -> Optional[Pattern]:
+        """获取指定算法集合的合并正则（按集合缓存，规则变更时清空）"""
+        key = (algs, as_bytes, use_regex)
+        if key not in self._union_cache:
+            if len(self._union_cache) >= self._UNION_CACHE_SIZE:
+                self._union_cache.clear()
+            self._union_cache[key] = self._build_union(algs, as_bytes, use_regex)
+        return self._union_cache[key]
+
+    def _build_union(self, algs: FrozenSet[str], as_bytes: bool = False, use_regex: bool = True) -> Optional[Pattern]:
+        """将指定算法的特征合并为一个带命名分组的正则，一次遍历即可匹配这些算法
+
+        每个特征包在前瞻 (?=(?P<名>...)) 中：匹配不消耗字符，某个特征的命中
+        不会吞掉其他特征在同一位置之后的命中（如 createSign('rsa-sha256') 中的 sha256）。
+        安装了regex且use_regex为真时用regex编译，编译失败时退回re。
+        regex与re在非ASCII字符上的语义不同（如忽略大小写时ı与i、\w与²），非ASCII文本只用re编译。
+        无法安全合并（含数字反向引用、全局内联标志、分组名冲突等）时返回None，退回逐个特征扫描。
+        """
+        groups = [(name, pattern) for alg, items in self._alg_groups.items() if alg in algs for name, pattern in items]
+        if not groups or any(self._BACKREF_RE.search(pattern) for _, pattern in groups):
+            return None
+        # 特征自带的命名分组跨特征重名、或与外层分组名相同时不合并：re会直接报错，
+        # regex却接受重名分组，命中时lastgroup会返回特征内的分组名而非外层的算法分组
+        inner_names = [name for alg in algs for compiled in self._compiled[alg] for name in compiled.groupindex]
+        if len(set(inner_names)) != len(inner_names) or not self._group_alg.keys().isdisjoint(inner_names):
+            self.logger.debug("特征的命名分组重名，将逐个特征扫描: %s", sorted(algs))
+            return None
+        union = "|".join(f"(?=(?P<{name}>{pattern}))" for name, pattern in groups)
+        if regex is not None and use_regex:
+            try:
+                return regex.compile(union.encode('utf-8') if as_bytes else union, regex.IGNORECASE)
+            except regex.error as e:
+                self.logger.debug("regex无法编译合并正则，改用re: %s", e)
+        try:
+            return re.compile(union.encode('utf-8') if as_bytes else union, re.IGNORECASE)
+        except re.error as e:
+            self.logger.debug("特征无法合并为单个正则，将逐个特征扫描: %s", e)
+            return None
+
+    def _build_literal_filter(self) -> None:
+        """为每个算法汇总必现字面量：代码中一个都不出现时，该算法不可能命中，扫描时直接跳过"""
+        self._alg_literals = {}
+        for alg, patterns in self.algorithms.items():
+            literal_sets = [self._required_literals(pattern) for pattern in patterns]
+            # 任一特征无法推导字面量、或字面量含非ASCII字符（忽略大小写时的匹配范围难以用lower()覆盖）时，该算法不参与预筛
+            self._alg_literals[alg] = (
+                None if any(literals is None or not all(literal.isascii() for literal in literals)
+                            for literals in literal_sets)
+                else set().union(*literal_sets)
+            )
+        self._alg_literals_bytes = {
+            alg: None if literals is None else {literal.encode('utf-8') for literal in literals}
+            for alg, literals in self._alg_literals.items()
+        }
+        filtered = sum(1 for literals in self._alg_literals.values() if literals is not None)
+        self.logger.debug("字面量预筛: %s/%s 个算法可预筛", filtered, len(self._alg_literals))
+
+    @classmethod
+    def _required_literals(cls, pattern: str) -> Optional[Set[str]]:
+        """保守推导特征命中时必然包含的字面量（小写），命中文本至少包含其中之一；无法推导时返回None
+
+        只分析顶层：顶层有 | 时放弃；候选为顶层必选的连续字面量片段，
+        以及不可省略的纯字面量分组（如 (atob|btoa)），取最短字面量最长的一个。
+        """
+        candidates: List[Set[str]] = []
+        run: List[str] = []  # 当前连续字面量
+
+        def flush() -> None:
+            if run:
+                candidates.append({"".join(run)})
+                run.clear()
+
+        i, n = 0, len(pattern)
+        while i < n:
+            c = pattern[i]
+            if c == '\\':
+                nxt = pattern[i + 1:i + 2]
+                if nxt and not nxt.isalnum():  # \( \. \' 等转义字面量
+                    run.append(nxt)
+                    i += 2
+                    continue
+                flush()  # 字符类、零宽断言、反向引用及 \xhh 等编码转义
+                if nxt in ('x', 'u', 'U'):
+                    i += {'x': 4, 'u': 6, 'U': 10}[nxt]
+                elif nxt == 'N':
+                    i = pattern.find('}', i) + 1 or n
+                elif nxt.isdigit():
+                    i += 2
+                    while i < n and pattern[i].isdigit():
+                        i += 1
+                else:
+                    i += 2
+            elif c == '[':
+                flush()
+                i += 1
+                if i < n and pattern[i] == '^':
+                    i += 1
+                if i < n and pattern[i] == ']':
+                    i += 1
+                while i < n and pattern[i] != ']':
+                    i += 2 if pattern[i] == '\\' else 1
+                i += 1
+            elif c == '(':
+                flush()
+                end = cls._find_group_end(pattern, i)
+                if end < 0:
+                    return None
+                body = pattern[i + 1:end]
+                i = end + 1
+                if body.startswith('?') and cls._INLINE_FLAGS_RE.fullmatch(body) \
+                        and 'x' in body.split(':', 1)[0]:
+                    return None  # 冗长模式下空白不是字面量
+                if body.startswith('?:'):
+                    body = body[2:]
+                elif body.startswith('?P<'):
+                    body = body[body.find('>') + 1:]
+                elif body.startswith('?'):
+                    continue  # 前后瞻、内联标志等不贡献字面量
+                optional = i < n and (pattern[i] in '?*' or cls._QUANTIFIER_RE.match(pattern, i) is not None)
+                if not optional and cls._LITERAL_ALTS_RE.fullmatch(body):
+                    candidates.append({alt.lower() for alt in body.split('|')})
+            elif c == '|':
+                return None
+            elif c == '{' and not cls._QUANTIFIER_RE.match(pattern, i):
+                run.append(c)  # 不构成 {m,n} 量词的 { 是普通字符
+                i += 1
+            elif c in '?*{':
+                if run:
+                    run.pop()  # 前一个字符可省略
+                flush()
+                i = pattern.find('}', i) + 1 if c == '{' else i + 1
+            elif c in '+.^$':
+                flush()
+                i += 1
+            elif c == ')':
+                return None
+            else:
+                run.append(c)
+                i += 1
+        flush()
+
+        candidates = [{literal.lower() for literal in literals} for literals in candidates]
+        if not candidates:
+            return None
+        best = max(candidates, key=lambda literals: (min(map(len, literals)), -len(literals)))
+        if min(map(len, best)) < cls._MIN_LITERAL_LEN:
+            return None
+        return best
+
+    @staticmethod
+    def _find_group_end(pattern: str, start: int) -> int:
+        """返回与 start 处左括号匹配的右括号下标（跳过转义与字符类），不匹配时返回-1"""
+        depth = 0
+        i, n = start, len(pattern)
+        while i < n:
+            c = pattern[i]
+            if c == '\\':
+                i += 2
+                continue
+            if c == '[':
+                i += 1
+                if i < n and pattern[i] == '^':
+                    i += 1
+                if i < n and pattern[i] == ']':
+                    i += 1
+                while i < n and pattern[i] != ']':
+                    i += 2 if pattern[i] == '\\' else 1
+            elif c == '(':
+                depth += 1
+            elif c == ')':
+                depth -= 1
+                if depth == 0:
+                    return i
+            i += 1
+        return -1
+
+    def _active_algorithms(self, cleaned_code: Union[str, bytes]) -> FrozenSet[str]:
+        """字面量预筛：返回在代码中可能命中的算法集合
+
+        re.IGNORECASE按Unicode大小写匹配，范围比lower()宽（ſ匹配s、K匹配k、ı和İ匹配i）。
+        非ASCII文本先把ı、İ换成i再casefold（casefold会把İ展开为i加组合点），
+        此时与ASCII字面量忽略大小写相等的字符都折叠为该字面量字符本身。
+        """
+        if isinstance(cleaned_code, str) and not cleaned_code.isascii():
+            lowered = cleaned_code.translate(self._DOTTED_I_FOLD).casefold()
+        else:
+            lowered = cleaned_code.lower()
+        alg_literals = self._alg_literals_bytes if isinstance(cleaned_code, bytes) else self._alg_literals
+        return frozenset(
+            alg for alg, literals in alg_literals.items()
+            if literals is None or any(literal in lowered for literal in literals)
+        )
+
+    def _build_hyperscan_db(self) -> None:
+        """将全部特征编译为一个Hyperscan数据库，未安装或规则不兼容时回退到re引擎"""
+        self._hs_db = None
+        self._hs_ids = [(alg, pattern) for alg, patterns in self.algorithms.items() for pattern in patterns]
+        if hyperscan is None or self.regex_engine == "re" or not self._hs_ids:
+            return
+        if self._compiled_bytes is None:
+            # 与字节模式相同：非ASCII特征或字节模式不支持的语法不交给按字节匹配的Hyperscan
+            self.logger.debug("特征库不适用字节模式，不构建Hyperscan数据库")
+            return
+
+        count = len(self._hs_ids)
+        try:
+            db = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+            db.compile(
+                expressions=[pattern.encode('utf-8') for _, pattern in self._hs_ids],
+                ids=list(range(count)),
+                elements=count,
+                flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SOM_LEFTMOST] * count
+            )
+            self._hs_db = db
+            self.logger.debug("已构建Hyperscan数据库: %s 个特征", count)
+        except hyperscan.error as e:
+            self.logger.warning("Hyperscan编译特征库失败，回退到re引擎: %s", e)
+
     @staticmethod
     def _get_json_error_context(content: str, lineno: int, colno: int) -> str:
         """提取JSON解析错误位置附近的内容，帮助用户定位问题"""
@@ -396,24 +874,24 @@ class JSEncryptionDetector:
                     break
                 self.print_color(f"   {pat_idx}. {pattern}", Color.WHITE)
 
-    def _view_rules_file(self, file_path: str, preview_only: bool = True) -> bool:
-        """查看规则文件内容，preview_only=True时仅预览不加载"""
+    def _view_rules_file(self, file_path: str, preview_only: bool = True) -> Optional[Dict[str, List[str]]]:
+        """查看规则文件内容，preview_only=True时仅预览不加载；返回解析并校验后的规则，失败时返回None"""
         if not os.path.isfile(file_path):
             self.print_color(f"❌ 规则文件不存在: {file_path}", Color.RED)
-            self.logger.error(f"规则文件不存在: {file_path}")
-            return False
+            self.logger.error("规则文件不存在: %s", file_path)
+            return None
 
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
+            with open(file_path, 'rb') as f:
                 try:
-                    rules = json.load(f)
+                    rules = _json_loads(f.read())
                 except json.JSONDecodeError as e:
                     self.print_color(f"❌ JSON格式错误 (行 {e.lineno}, 列 {e.colno}): {e.msg}", Color.RED)
-                    self.logger.error(f"JSON格式错误 (行 {e.lineno}, 列 {e.colno}): {e.msg}")
-                    return False
+                    self.logger.error("JSON格式错误 (行 %s, 列 %s): %s", e.lineno, e.colno, e.msg)
+                    return None
 
             if not self._validate_rules(rules):
-                return False
+                return None
 
             alg_count = len(rules)
             pattern_count = sum(len(patterns) for patterns in rules.values())
@@ -425,11 +903,11 @@ class JSEncryptionDetector:
             if self.confirm("是否查看详细内容？"):
                 self._print_detailed_rules_from_dict(rules)
 
-            return True
+            return rules
         except Exception as e:
             self.print_color(f"❌ 处理规则文件失败: {str(e)}", Color.RED)
-            self.logger.error(f"处理规则文件失败: {str(e)}", exc_info=True)
-            return False
+            self.logger.error("处理规则文件失败: %s", e, exc_info=True)
+            return None
 
     def _print_detailed_rules_from_dict(self, rules: Dict[str, List[str]], max_patterns_per_alg: int = 5) -> None:
         """从字典详细打印规则"""
@@ -472,19 +950,19 @@ class JSEncryptionDetector:
         try:
             filename = self._get_unique_key_filename()
             
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump({
+            with open(filename, 'wb') as f:
+                f.write(_json_dumps({
                     "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
                     "count": len(self.current_detection_results),
                     "results": self.current_detection_results
-                }, f, ensure_ascii=False, indent=2)
+                }))
             
             self.print_color(f"✅ 检测结果已保存至: {filename}", Color.GREEN)
-            self.logger.info(f"检测结果已保存至: {filename}，共{len(self.current_detection_results)}条记录")
+            self.logger.info("检测结果已保存至: %s，共%s条记录", filename, len(self.current_detection_results))
             return True
         except Exception as e:
             self.print_color(f"❌ 保存检测结果失败: {str(e)}", Color.RED)
-            self.logger.error(f"保存检测结果失败: {str(e)}", exc_info=True)
+            self.logger.error("保存检测结果失败: %s", e, exc_info=True)
             return False
 
     def view_saved_keys(self) -> None:
@@ -492,21 +970,25 @@ class JSEncryptionDetector:
         self.logger.info("查看已保存的密钥信息")
         try:
             # 修复1：使用fullmatch确保完整匹配文件名，避免匹配类似key.json.bak的文件
-            key_files = [
-                f for f in os.listdir('.') 
-                if os.path.isfile(f) and re.fullmatch(r'key(_\d+)?\.json', f)
-            ]
+            # scandir的目录项自带文件类型，先按文件名过滤，只对匹配的文件stat一次取修改时间
+            entries = []
+            with os.scandir('.') as it:
+                for entry in it:
+                    if not self._KEY_FILE_RE.fullmatch(entry.name):
+                        continue
+                    try:
+                        if entry.is_file():
+                            entries.append((entry.name, entry.stat().st_mtime))
+                    except OSError as e:
+                        self.logger.warning("读取文件信息失败 %s: %s", entry.name, e)
             
-            if not key_files:
+            if not entries:
                 self.print_color("⚠️ 未找到保存的密钥信息文件", Color.YELLOW)
                 return
                 
-            # 修复2：按修改时间排序（最新的在前），增加异常处理
-            try:
-                key_files.sort(key=lambda x: os.path.getmtime(x), reverse=True)
-            except Exception as e:
-                self.print_color(f"⚠️ 排序文件时出错，将使用原始顺序: {str(e)}", Color.YELLOW)
-                self.logger.warning(f"排序文件失败: {str(e)}")
+            # 修复2：按修改时间排序（最新的在前）
+            entries.sort(key=lambda item: item[1], reverse=True)
+            key_files = [name for name, _ in entries]
             
             # 修复3：显示文件列表时增加序号，方便用户选择
             self.print_panel("已保存的密钥信息文件（按修改时间排序）", 
@@ -532,24 +1014,24 @@ class JSEncryptionDetector:
                 
                 if not os.path.exists(filename):
                     self.print_color("❌ 文件不存在", Color.RED)
-                    self.logger.error(f"用户指定的文件不存在: {filename}")
+                    self.logger.error("用户指定的文件不存在: %s", filename)
                     return
                 
                 # 修复5：增强JSON文件读取的错误处理
                 try:
-                    with open(filename, 'r', encoding='utf-8') as f:
+                    with open(filename, 'rb') as f:
                         try:
-                            data = json.load(f)
+                            data = _json_loads(f.read())
                         except json.JSONDecodeError as e:
                             self.print_color(f"❌ 文件格式错误（不是有效的JSON）: 行 {e.lineno}, 列 {e.colno}", Color.RED)
-                            self.logger.error(f"文件 {filename} JSON格式错误: {str(e)}")
+                            self.logger.error("文件 %s JSON格式错误: %s", filename, e)
                             return
                     
                     # 验证文件结构
                     required_keys = ["timestamp", "count", "results"]
                     if not all(k in data for k in required_keys):
                         self.print_color("❌ 文件格式错误，缺少必要字段", Color.RED)
-                        self.logger.error(f"文件 {filename} 结构无效")
+                        self.logger.error("文件 %s 结构无效", filename)
                         return
                     
                     self.print_panel(
@@ -567,162 +1049,505 @@ class JSEncryptionDetector:
                                 print(f"上下文:\n{item.get('context', '无上下文')}\n")
                 except Exception as e:
                     self.print_color(f"❌ 查看文件失败: {str(e)}", Color.RED)
-                    self.logger.error(f"查看文件 {filename} 失败: {str(e)}", exc_info=True)
+                    self.logger.error("查看文件 %s 失败: %s", filename, e, exc_info=True)
         except Exception as e:
             self.print_color(f"❌ 查看保存的密钥信息时出错: {str(e)}", Color.RED)
-            self.logger.error(f"查看保存的密钥信息失败: {str(e)}", exc_info=True)
+            self.logger.error("查看保存的密钥信息失败: %s", e, exc_info=True)
 
     # ------------------------------
     # 代码预处理
     # ------------------------------
-    def remove_comments(self, js_code: str) -> str:
-        """移除JS代码中的注释"""
+    def remove_comments(self, js_code: Union[str, bytes]) -> Union[str, bytes]:
+        """移除JS代码中的注释（支持str，以及bytes/mmap等字节数据）"""
         try:
-            code = re.sub(r"//.*?$", "", js_code, flags=re.MULTILINE)  # 单行注释
-            code = re.sub(r"/\*.*?\*/", "", code, flags=re.DOTALL)      # 多行注释
+            comment_re = self._COMMENT_RE if isinstance(js_code, str) else self._COMMENT_RE_BYTES
+            code = comment_re.sub("" if isinstance(js_code, str) else b"", js_code)
             self.logger.debug("成功移除JS注释")
             return code
         except Exception as e:
-            self.logger.error(f"移除JS注释失败: {str(e)}", exc_info=True)
+            self.logger.error("移除JS注释失败: %s", e, exc_info=True)
             return js_code
 
     @staticmethod
     def _extract_js_from_html(html_code: str) -> str:
         """从HTML中提取<script>标签内的JS代码"""
+        return JSEncryptionDetector._extract_scripts(html_code)[0]
+
+    @staticmethod
+    def _extract_scripts(html_code: Union[str, bytes]) -> Tuple[str, List[str]]:
+        """一次解析HTML，同时提取内联<script>代码和外部<script src>地址（bytes由BeautifulSoup按meta/BOM识别编码）"""
+        if LexborHTMLParser is not None:
+            result = JSEncryptionDetector._extract_scripts_lexbor(html_code)
+            if result is not None:
+                return result
         try:
-            soup = BeautifulSoup(html_code, 'html.parser')
-            script_tags = soup.find_all('script')
+            soup = BeautifulSoup(html_code, _HTML_PARSER, parse_only=_SCRIPT_STRAINER)
             js_blocks = []
-            for tag in script_tags:
+            script_srcs = []
+            for tag in soup.find_all('script'):
+                if tag.has_attr('src'):
+                    script_srcs.append(tag['src'])
                 if tag.string:
                     js_blocks.append(tag.string.strip())
-            return "\n".join(js_blocks)
+            return "\n".join(js_blocks), script_srcs
         except Exception as e:
-            logging.error(f"提取HTML中的JS代码失败: {str(e)}", exc_info=True)
-            return ""
+            logging.error("提取HTML中的JS代码失败: %s", e, exc_info=True)
+            return "", []
+
+    @staticmethod
+    def _extract_scripts_lexbor(html_code: Union[str, bytes]) -> Optional[Tuple[str, List[str]]]:
+        """selectolax快速路径；非UTF-8字节（GBK等需按meta识别编码）或解析失败时返回None，交由BeautifulSoup处理"""
+        if isinstance(html_code, bytes):
+            try:
+                html_code = html_code.decode('utf-8')
+            except UnicodeDecodeError:
+                return None
+        try:
+            js_blocks = []
+            script_srcs = []
+            for node in JSEncryptionDetector._iter_lexbor_scripts(html_code):
+                attrs = node.attributes
+                if 'src' in attrs:
+                    script_srcs.append(attrs['src'] or '')
+                text = node.text(deep=True)
+                if text:
+                    js_blocks.append(text.strip())
+            return "\n".join(js_blocks), script_srcs
+        except Exception as e:
+            logging.debug("selectolax解析失败，改用BeautifulSoup: %s", e)
+            return None
+
+    @staticmethod
+    def _iter_lexbor_scripts(html_code: str) -> Iterator:
+        """按文档顺序产出<script>节点；<template>的内容不在文档树中，截取后单独解析，与BeautifulSoup提取的脚本一致"""
+        for node in LexborHTMLParser(html_code).css('script, template'):
+            if node.tag == 'script':
+                yield node
+                continue
+            for name in list(node.attrs.keys()):
+                del node.attrs[name]  # 去掉属性后开始标签固定为<template>，便于截取内容
+            yield from JSEncryptionDetector._iter_lexbor_scripts(node.html[len('<template>'):-len('</template>')])
 
     # ------------------------------
     # 加密算法检测
     # ------------------------------
-    def detect_in_code(self, js_code: str, source: str) -> List[Dict]:
-        """检测代码中的加密算法（source为来源标识：文件路径或URL）"""
-        self.logger.info(f"开始检测代码中的加密算法，来源: {source}")
+    def detect_in_code(self, js_code: Union[str, bytes], source: str, first_match_only: bool = False) -> List[Dict]:
+        """检测代码中的加密算法（source为来源标识：文件路径或URL；js_code可为str或bytes）
+
+        first_match_only为True时每种算法只记录首次命中，所有参与扫描的算法都命中后立即停止扫描。
+        """
+        self.logger.debug("开始检测代码中的加密算法，来源: %s", source)
+        source = sys.intern(source)
         results = []
+        if not isinstance(js_code, str) and self._compiled_bytes is None:
+            js_code = self._to_text(bytes(js_code))  # 特征库不支持字节模式时先解码
         cleaned_code = self.remove_comments(js_code)
-        lines = cleaned_code.splitlines()
+        byte_safe = self._is_byte_safe(cleaned_code)
+        if not isinstance(cleaned_code, str) and not byte_safe:
+            # 非ASCII内容解码后按文本扫描，保证与str输入的检测结果一致（注释已在字节上移除，不影响解码结果）
+            cleaned_code = self._to_text(bytes(cleaned_code))
+
+        seen: Set[Tuple[str, int]] = set()  # 已记录的 (算法, 行号)，同一来源内重复命中直接跳过
+        # Hyperscan的\b、\w与忽略大小写只认ASCII（UCP模式又不支持\b），非ASCII代码交给re引擎
+        use_hyperscan = self._hs_db is not None and byte_safe
+        if not use_hyperscan or not self._scan_with_hyperscan(cleaned_code, source, seen, results, first_match_only):
+            if len(cleaned_code) > self._MAX_SCAN_CHARS:
+                self.logger.info("代码长度 %s 超过 %s，按窗口分段扫描: %s", len(cleaned_code), self._MAX_SCAN_CHARS, source)
+            active = self._active_algorithms(cleaned_code)
+            if active:
+                newline_offsets = self._get_newline_offsets(cleaned_code)
+                self._scan_with_re(cleaned_code, source, newline_offsets, active, seen, results, first_match_only)
+            else:
+                self.logger.debug("字面量预筛未命中任何算法，跳过正则扫描: %s", source)
+
+        self.logger.debug("代码检测完成，来源: %s，共发现 %s 处匹配", source, len(results))
+        return results
 
-        for alg_name, patterns in self.algorithms.items():
-            self.logger.debug(f"检测算法: {alg_name}，特征数: {len(patterns)}")
+    @classmethod
+    def _is_byte_safe(cls, code: Union[str, bytes]) -> bool:
+        """代码是否只含字节模式与文本模式正则语义一致的字符（见_BYTE_UNSAFE_RE）"""
+        if isinstance(code, str):
+            return code.isascii() and cls._TEXT_CTRL_RE.search(code) is None
+        return cls._BYTE_UNSAFE_RE.search(code) is None
+
+    def _scan_with_re(self, cleaned_code: Union[str, bytes], source: str,
+                      newline_offsets: List[int], active: FrozenSet[str],
+                      seen: Set[Tuple[str, int]], results: List[Dict], first_match_only: bool = False) -> None:
+        """使用预编译正则扫描预筛后的算法（优先使用合并正则单遍扫描），同一算法同一行只记录首次命中"""
+        as_bytes = isinstance(cleaned_code, bytes)
+        # 字节模式只接收ASCII安全内容；非ASCII文本用re编译的合并正则，保持与逐特征扫描一致
+        union = self._get_union(active, as_bytes, as_bytes or cleaned_code.isascii())
+        if union is not None:
+            remaining = set(active) if first_match_only else None
+            self._scan_with_union(union, cleaned_code, source, newline_offsets, active, seen, results, remaining)
+            return
+
+        compiled = self._compiled_bytes if isinstance(cleaned_code, bytes) else self._compiled
+        contexts: Dict[int, str] = {}
+        debug = self.logger.isEnabledFor(logging.DEBUG)  # 逐特征日志最频繁，关闭DEBUG时连日志调用一并跳过
+        for alg_name, patterns in compiled.items():
+            if alg_name not in active:
+                continue
+            if debug:
+                self.logger.debug("检测算法: %s，特征数: %s", alg_name, len(patterns))
             for pattern in patterns:
-                try:
-                    matches = re.finditer(pattern, cleaned_code, re.IGNORECASE)
-                    match_count = 0
-                    for match in matches:
-                        match_count += 1
-                        line_num = self._get_line_number(cleaned_code, match.start()) + 1
-                        context = self._get_context(lines, line_num)
-                        result = {
-                            "algorithm": alg_name,
-                            "source": source,
-                            "line": line_num,
-                            "match": match.group(),
-                            "context": context
-                        }
-                        results.append(result)
-                    self.logger.debug(f"算法 {alg_name} 使用模式 {pattern} 匹配到 {match_count} 处")
-                except re.error as e:
-                    self.print_color(f"❌ 无效正则表达式: {pattern} (算法: {alg_name})", Color.RED)
-                    self.logger.error(f"无效正则表达式 {pattern} (算法: {alg_name}): {str(e)}")
+                matches = self._iter_matches(pattern, cleaned_code)
+                if first_match_only:
+                    matches = itertools.islice(matches, 1)
+                match_count = _collect_pattern_matches(
+                    matches, alg_name, cleaned_code, source, newline_offsets, seen, results, contexts
+                )
+                if debug:
+                    self.logger.debug("算法 %s 使用模式 %s 匹配到 %s 处", alg_name, pattern.pattern, match_count)
+                if first_match_only and match_count:
+                    break
+
+    def _iter_matches(self, pattern: Pattern, code: Union[str, bytes]) -> Iterator[Match]:
+        """执行finditer；超大输入按重叠窗口分段（pos/endpos限定范围，不复制数据）
+
+        每个起始位置只归属一个窗口；恰好止于窗口边界的命中可能被截断（如\b误判），予以丢弃，
+        由窗口重叠部分保证正常长度的命中仍能被完整匹配。
+        """
+        length = len(code)
+        if length <= self._MAX_SCAN_CHARS:
+            yield from pattern.finditer(code)
+            return
+
+        for window_start in range(0, length, self._SCAN_WINDOW):
+            window_end = window_start + self._SCAN_WINDOW
+            endpos = min(length, window_end + self._WINDOW_OVERLAP)
+            for match in pattern.finditer(code, window_start, endpos):
+                if match.start() >= window_end:
+                    break
+                # 合并正则的整体匹配宽度为0，命中内容的结束位置取最外层分组
+                match_end = max(match.end(), match.end(match.lastindex) if match.lastindex else 0)
+                if match_end == endpos < length:
+                    continue
+                yield match
+
+    def _scan_with_union(self, union: Pattern, cleaned_code: Union[str, bytes], source: str,
+                         newline_offsets: List[int], active: FrozenSet[str], seen: Set[Tuple[str, int]],
+                         results: List[Dict], remaining: Optional[Set[str]] = None) -> None:
+        """使用合并正则单遍扫描，通过命中的分组名还原算法（remaining见_collect_union_matches）
+
+        合并正则在每个位置只报告第一个成功的分支，排在其后的算法在同一位置的命中由
+        followers中各算法的特征正则在该位置补充匹配（排在前面的分支在该位置已匹配失败，无需再试）。
+        """
+        compiled = self._compiled_bytes if isinstance(cleaned_code, bytes) else self._compiled
+        ordered = [alg for alg in self._alg_groups if alg in active]
+        followers = {alg: [(later, compiled[later]) for later in ordered[i + 1:]] for i, alg in enumerate(ordered)}
+        match_count = _collect_union_matches(
+            self._iter_matches(union, cleaned_code), self._group_alg, followers,
+            cleaned_code, source, newline_offsets, seen, results, remaining
+        )
+        self.logger.debug("合并正则扫描完成，来源: %s，命中 %s 处", source, match_count)
+
+    def _scan_with_hyperscan(self, cleaned_code: Union[str, bytes], source: str,
+                             seen: Set[Tuple[str, int]], results: List[Dict], first_match_only: bool = False) -> bool:
+        """使用Hyperscan单遍扫描全部特征，扫描失败时返回False以便回退到re引擎"""
+        data = cleaned_code if isinstance(cleaned_code, bytes) else cleaned_code.encode('utf-8', 'ignore')
+        hits = []
+        found: Set[str] = set()  # first_match_only时已命中的算法
+        total_algs = len(self.algorithms)
+
+        def on_match(pattern_id: int, start: int, end: int, flags: int, context) -> Optional[bool]:
+            if first_match_only:
+                alg_name = self._hs_ids[pattern_id][0]
+                if alg_name in found:
+                    return None
+                found.add(alg_name)
+                hits.append((pattern_id, start, end))
+                return len(found) == total_algs  # 返回True时Hyperscan终止本次扫描
+            hits.append((pattern_id, start, end))
+            return None
+
+        try:
+            self._hs_db.scan(data, match_event_handler=on_match, scratch=self._get_hs_scratch())
+        except hyperscan.ScanTerminated:
+            pass
+        except hyperscan.error as e:
+            self.logger.warning("Hyperscan扫描失败，回退到re引擎，来源: %s: %s", source, e)
+            return False
+
+        newline_offsets = self._get_newline_offsets(data)
+        contexts: Dict[int, str] = {}  # 行号 -> 上下文，同一行被多个算法命中时只切片一次
+        for pattern_id, start, end in hits:
+            alg_name = self._hs_ids[pattern_id][0]
+            line_num = self._get_line_number(newline_offsets, start) + 1
+            if (alg_name, line_num) in seen:
+                continue
+            seen.add((alg_name, line_num))
+            context = contexts.get(line_num)
+            if context is None:
+                context = contexts[line_num] = self._get_context(data, newline_offsets, line_num)
+            results.append({
+                "algorithm": alg_name,
+                "source": source,
+                "line": line_num,
+                "match": data[start:end].decode('utf-8', 'ignore'),
+                "context": context
+            })
+        self.logger.debug("Hyperscan扫描完成，来源: %s，命中 %s 处", source, len(hits))
+        return True
+
+    def _get_hs_scratch(self):
+        """获取当前线程的Hyperscan scratch，首次使用或特征库重建后重新分配"""
+        local = self._hs_local
+        if getattr(local, "db", None) is not self._hs_db:
+            local.scratch = hyperscan.Scratch(self._hs_db)
+            local.db = self._hs_db
+        return local.scratch
+
+    @staticmethod
+    def _get_newline_offsets(code) -> List[int]:
+        """预计算代码中所有换行符的位置（支持str和bytes），每份代码只需计算一次"""
+        if numpy is not None and JSEncryptionDetector._prefer_numpy_offsets(code):
+            return JSEncryptionDetector._get_newline_offsets_numpy(code)
+        newline = b'\n' if isinstance(code, bytes) else '\n'
+        offsets = []
+        pos = code.find(newline)
+        while pos != -1:
+            offsets.append(pos)
+            pos = code.find(newline, pos + 1)
+        return offsets
+
+    @classmethod
+    def _prefer_numpy_offsets(cls, code) -> bool:
+        """numpy只在字节或纯ASCII文本、且行较短（换行符密集）时更快
+
+        numpy需对整份数据做一次比较并分配同样大小的布尔数组；换行稀少的压缩代码用find逐个查找更快，
+        非ASCII文本还要先展开为UTF-32，时间与内存都不划算。行密度按开头_NUMPY_SAMPLE_SIZE估算。
+        """
+        if len(code) < cls._NUMPY_MIN_SIZE or (isinstance(code, str) and not code.isascii()):
+            return False
+        sample = code[:cls._NUMPY_SAMPLE_SIZE]
+        newlines = sample.count('\n' if isinstance(sample, str) else b'\n')
+        return newlines * cls._NUMPY_MAX_LINE_LEN >= len(sample)
+
+    @staticmethod
+    def _get_newline_offsets_numpy(code) -> List[int]:
+        """numpy版换行符定位（仅用于字节与纯ASCII文本，下标即字符下标）"""
+        if isinstance(code, str):
+            buf = numpy.frombuffer(code.encode('ascii'), dtype=numpy.uint8)
+        else:
+            buf = numpy.frombuffer(code, dtype=numpy.uint8)
+        offsets = numpy.flatnonzero(buf == 0x0A).tolist()
+        del buf  # 及时释放对mmap缓冲区的引用，否则mmap无法关闭
+        return offsets
 
-        unique_results = self._deduplicate(results)
-        self.logger.info(f"代码检测完成，来源: {source}，共发现 {len(unique_results)} 处匹配")
-        return unique_results
+    @staticmethod
+    def _get_line_number(newline_offsets: List[int], position: int) -> int:
+        """根据字符位置二分查找行号（0开始）"""
+        return bisect.bisect_left(newline_offsets, position)
 
     @staticmethod
-    def _get_line_number(code: str, position: int) -> int:
-        """根据字符位置计算行号（0开始）"""
-        return code[:position].count('\n')
+    def _to_text(value: Union[str, bytes]) -> str:
+        """将字节模式扫描得到的内容解码为文本"""
+        return value.decode('utf-8', 'ignore') if isinstance(value, bytes) else value
 
     @staticmethod
-    def _get_context(lines: List[str], line_num: int, context_lines: int = 2) -> str:
-        """获取匹配行的上下文代码"""
-        start = max(0, line_num - context_lines - 1)
-        end = min(len(lines), line_num + context_lines)
+    def _get_context(code: Union[str, bytes], newline_offsets: List[int], line_num: int,
+                     context_lines: int = 2) -> str:
+        """获取匹配行的上下文代码（借助换行符位置只切出附近几行，无需对整份代码splitlines）"""
+        first = max(1, line_num - context_lines)
+        last = min(len(newline_offsets) + 1, line_num + context_lines)
+        start = newline_offsets[first - 2] + 1 if first > 1 else 0
+        end = newline_offsets[last - 1] if last <= len(newline_offsets) else len(code)
+        newline = b'\n' if isinstance(code, bytes) else '\n'
         context = []
-        for i in range(start, end):
-            line = lines[i].strip()
+        for i, line in enumerate(code[start:end].split(newline), first):
+            line = JSEncryptionDetector._to_text(line.strip())
             if line:
-                context.append(f"Line {i+1}: {line}")
+                context.append(f"Line {i}: {line}")
         return "\n".join(context)
 
-    @staticmethod
-    def _deduplicate(results: List[Dict]) -> List[Dict]:
-        """去重结果（同一算法+来源+行号）"""
-        seen = set()
-        unique = []
-        for res in results:
-            key = (res["algorithm"], res["source"], res["line"])
-            if key not in seen:
-                seen.add(key)
-                unique.append(res)
-        return unique
-
     # ------------------------------
     # 本地文件检测
     # ------------------------------
-    def detect_local_file(self, file_path: str) -> List[Dict]:
-        """检测本地文件（JS/HTML）"""
-        self.logger.info(f"开始检测本地文件: {file_path}")
+    def detect_local_file(self, file_path: str, first_match_only: bool = False) -> List[Dict]:
+        """检测本地文件（JS/HTML），first_match_only含义同detect_in_code"""
+        self.logger.debug("开始检测本地文件: %s", file_path)
         if not os.path.isfile(file_path):
             self.print_color(f"❌ 文件不存在: {file_path}", Color.RED)
-            self.logger.error(f"文件不存在: {file_path}")
+            self.logger.error("文件不存在: %s", file_path)
             return []
 
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-            self.logger.debug(f"成功读取文件: {file_path}，大小: {len(content)} 字符")
-
             if file_path.endswith(('.html', '.htm')):
-                js_code = self._extract_js_from_html(content)
-                self.logger.debug(f"从HTML文件中提取JS代码，长度: {len(js_code)} 字符")
+                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                    content = f.read()
+                self.logger.debug("成功读取文件: %s，大小: %s 字符", file_path, len(content))
+                if self._looks_binary(content[:self._BINARY_SNIFF_SIZE], file_path):
+                    return []
+                results = self._detect_html(content, file_path, first_match_only)
+            elif self._compiled_bytes is not None:
+                results = self._detect_mapped_file(file_path, first_match_only)
             else:
-                js_code = content
+                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                    js_code = f.read()
+                self.logger.debug("成功读取文件: %s，大小: %s 字符", file_path, len(js_code))
+                if self._looks_binary(js_code[:self._BINARY_SNIFF_SIZE], file_path):
+                    return []
+                if self._looks_like_html(js_code[:self._HTML_SNIFF_SIZE].encode('utf-8')):
+                    results = self._detect_html(js_code, file_path, first_match_only)
+                else:
+                    results = self.detect_in_code(js_code, file_path, first_match_only)
 
-            results = self.detect_in_code(js_code, file_path)
-            self.logger.info(f"本地文件检测完成: {file_path}，发现 {len(results)} 处匹配")
+            self.logger.debug("本地文件检测完成: %s，发现 %s 处匹配", file_path, len(results))
             return results
         except Exception as e:
             self.print_color(f"❌ 处理文件错误 {file_path}: {str(e)}", Color.RED)
-            self.logger.error(f"处理文件错误 {file_path}: {str(e)}", exc_info=True)
+            self.logger.error("处理文件错误 %s: %s", file_path, e, exc_info=True)
+            return []
+
+    def _detect_mapped_file(self, file_path: str, first_match_only: bool = False) -> List[Dict]:
+        """以字节形式读取JS文件并直接用字节模式正则扫描，免去整文件解码为str
+
+        超过_MMAP_MIN_BYTES的文件用mmap映射，避免复制到Python对象；小文件直接read，省去建立映射的系统调用开销。
+        """
+        with open(file_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < self._MMAP_MIN_BYTES:  # 空文件也走此分支（空文件无法mmap）
+                self.logger.debug("读取文件: %s，大小: %s 字节", file_path, size)
+                return self._detect_bytes(f.read(), file_path, first_match_only)
+            self.logger.debug("映射文件: %s，大小: %s 字节", file_path, size)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return self._detect_bytes(mm, file_path, first_match_only)
+
+    def _detect_bytes(self, data: Union[bytes, mmap.mmap], file_path: str,
+                      first_match_only: bool = False) -> List[Dict]:
+        """检测文件的原始字节：跳过二进制文件，HTML内容先提取<script>"""
+        if self._looks_binary(data[:self._BINARY_SNIFF_SIZE], file_path):
             return []
+        if self._looks_like_html(data[:self._HTML_SNIFF_SIZE]):
+            return self._detect_html(self._to_text(data[:]), file_path, first_match_only)
+        return self.detect_in_code(data, file_path, first_match_only)
+
+    def _detect_html(self, content: str, file_path: str, first_match_only: bool = False) -> List[Dict]:
+        """提取HTML中的<script>代码并检测"""
+        js_code = self._extract_js_from_html(content)
+        self.logger.debug("从HTML文件中提取JS代码，长度: %s 字符", len(js_code))
+        return self.detect_in_code(js_code, file_path, first_match_only)
+
+    def _looks_binary(self, head: Union[str, bytes], file_path: str) -> bool:
+        """文件开头含NUL字符时视为二进制文件（图片、字体、压缩包等被误命名的文件），跳过检测"""
+        if ('\0' if isinstance(head, str) else b'\0') in head:
+            self.logger.debug("文件包含二进制内容，跳过: %s", file_path)
+            return True
+        return False
+
+    @classmethod
+    def _looks_like_html(cls, head: bytes) -> bool:
+        """根据文件开头的字节判断内容是否为HTML"""
+        return cls._HTML_SNIFF_RE.match(head) is not None
 
     def detect_directory(self, dir_path: str) -> List[Dict]:
         """检测目录下所有JS/HTML文件"""
-        self.logger.info(f"开始检测目录: {dir_path}")
+        self.logger.info("开始检测目录: %s", dir_path)
         if not os.path.isdir(dir_path):
             self.print_color(f"❌ 目录不存在: {dir_path}", Color.RED)
-            self.logger.error(f"目录不存在: {dir_path}")
+            self.logger.error("目录不存在: %s", dir_path)
             return []
 
-        results = []
-        extensions = ('.js', '.mjs', '.cjs', '.html', '.htm')
-        files = [str(f) for f in Path(dir_path).rglob('*') if f.suffix in extensions]
+        oversized: List[str] = []
+        files = list(self._iter_source_files(dir_path, oversized))
         total = len(files)
+        if oversized:
+            self.print_color(f"⚠️ 跳过 {len(oversized)} 个超过 {self._MAX_DIR_FILE_BYTES // (1024 * 1024)} MiB 的文件", Color.YELLOW)
+            self.logger.info("跳过 %s 个超过大小上限的文件: %s", len(oversized), oversized)
 
         if total == 0:
             self.print_color("⚠️ 未找到符合条件的文件", Color.YELLOW)
-            self.logger.warning(f"目录 {dir_path} 中未找到符合条件的文件")
+            self.logger.warning("目录 %s 中未找到符合条件的文件", dir_path)
             return []
 
-        self.logger.info(f"在目录 {dir_path} 中找到 {total} 个文件待检测")
+        self.logger.info("在目录 %s 中找到 %s 个文件待检测", dir_path, total)
+        if total < self._PARALLEL_MIN_FILES or (os.cpu_count() or 1) == 1:
+            results = self._detect_files_serial(files)
+        else:
+            try:
+                results = self._detect_files_parallel(files)
+            except (OSError, BrokenProcessPool) as e:
+                self.print_color(f"⚠️ 多进程检测不可用，改为逐个检测: {str(e)}", Color.YELLOW)
+                self.logger.warning("多进程检测失败，回退到单进程: %s", e, exc_info=True)
+                results = self._detect_files_serial(files)
+
+        self.logger.info("目录检测完成: %s，共发现 %s 处匹配", dir_path, len(results))
+        return results
+
+    def _iter_source_files(self, dir_path: str, oversized: List[str]) -> Iterator[str]:
+        """用os.scandir递归遍历目录，产出待检测文件路径（目录项自带类型信息，无需逐个stat或构造Path）
+
+        只对扩展名匹配的文件取大小，超过_MAX_DIR_FILE_BYTES的文件记入oversized而不检测。
+        """
+        try:
+            entries = list(os.scandir(dir_path))
+        except OSError as e:
+            self.logger.warning("无法读取目录 %s: %s", dir_path, e)
+            return
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from self._iter_source_files(entry.path, oversized)
+                elif entry.name.lower().endswith(self._SOURCE_EXTENSIONS) and entry.is_file():
+                    if entry.stat().st_size > self._MAX_DIR_FILE_BYTES:
+                        oversized.append(entry.path)
+                    else:
+                        yield entry.path
+            except OSError as e:
+                self.logger.warning("无法访问 %s: %s", entry.path, e)
+
+    def _detect_files_serial(self, files: List[str]) -> List[Dict]:
+        """在当前进程中逐个检测文件"""
+        results = []
+        total = len(files)
+        step = max(1, total // self._PROGRESS_UPDATES)
         for i, file in enumerate(files, 1):
-            self.show_progress(i, total, f"正在处理: {os.path.basename(file)}")
-            file_results = self.detect_local_file(file)
-            results.extend(file_results)
-            time.sleep(0.01)
+            if i % step == 0 or i == total:
+                self.show_progress(i, total, f"正在处理: {os.path.basename(file)}")
+            results.extend(self.detect_local_file(file))
+            if i % self._LOG_EVERY_FILES == 0:
+                self.logger.debug("目录检测进度: %s/%s，已发现 %s 处匹配", i, total, len(results))
+        return results
 
-        self.logger.info(f"目录检测完成: {dir_path}，共发现 {len(results)} 处匹配")
+    def _detect_files_parallel(self, files: List[str]) -> List[Dict]:
+        """使用进程池并行检测文件，工作进程以当前特征库初始化"""
+        total = len(files)
+        max_workers = min(total, os.cpu_count() or 1)
+        chunksize = max(1, min(16, total // (max_workers * 4)))
+        self.logger.debug("启动 %s 个工作进程，chunksize=%s", max_workers, chunksize)
+
+        # 工作进程的日志经跨进程队列交给主进程的处理器输出（控制台 + debug.log后台写入线程）
+        context = multiprocessing.get_context()
+        log_queue = context.Queue()
+        log_listener = QueueListener(log_queue, *self.logger.handlers, respect_handler_level=True)
+        log_listener.start()
+        try:
+            return self._run_worker_pool(files, max_workers, chunksize, context, log_queue)
+        finally:
+            log_listener.stop()  # 工作进程均已退出，写完队列中剩余的日志
+            log_queue.close()
+
+    def _run_worker_pool(self, files: List[str], max_workers: int, chunksize: int,
+                         context: multiprocessing.context.BaseContext,
+                         log_queue: "multiprocessing.Queue") -> List[Dict]:
+        """在进程池中检测文件并按顺序汇总结果"""
+        results = []
+        total = len(files)
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context, initializer=_init_scan_worker,
+                                 initargs=(self.algorithms, self.regex_engine, log_queue)) as executor:
+            file_results_iter = executor.map(_scan_one_file, files, chunksize=chunksize)
+            step = max(1, total // self._PROGRESS_UPDATES)
+            for i, (file, file_results) in enumerate(zip(files, file_results_iter), 1):
+                if i % step == 0 or i == total:
+                    self.show_progress(i, total, f"正在处理: {os.path.basename(file)}")
+                # 经pickle传回的结果中字符串各自独立，重新驻留以免每条结果各持一份副本
+                for res in file_results:
+                    res["algorithm"] = sys.intern(res["algorithm"])
+                    res["source"] = sys.intern(res["source"])
+                results.extend(file_results)
+                if i % self._LOG_EVERY_FILES == 0:
+                    self.logger.debug("目录检测进度: %s/%s，已发现 %s 处匹配", i, total, len(results))
         return results
 
     # ------------------------------
@@ -730,60 +1555,273 @@ class JSEncryptionDetector:
     # ------------------------------
     def crawl_and_detect(self, url: str, max_depth: int = 1) -> List[Dict]:
         """爬取网页并检测JS中的加密算法"""
-        self.logger.info(f"开始爬取并检测网页: {url}，最大深度: {max_depth}")
-        results = []
-        visited: Set[str] = set()
+        self.logger.info("开始爬取并检测网页: %s，最大深度: %s", url, max_depth)
+        try:
+            results, visited_count = asyncio.run(self._crawl_async(url, max_depth))
+        except Exception as e:
+            self.print_color(f"⚠️ 爬取页面失败 {url}: {str(e)}", Color.YELLOW)
+            self.logger.warning("爬取页面失败 %s: %s", url, e, exc_info=True)
+            return []
+        self.print_color(f"✅ 爬取完成，共处理 {visited_count} 个URL", Color.GREEN)
+        self.logger.info("爬取完成，共处理 %s 个URL，发现 %s 处匹配", visited_count, len(results))
+        return results
 
-        def _crawl(current_url: str, depth: int) -> None:
-            if depth > max_depth or current_url in visited:
-                return
-            visited.add(current_url)
-            self.logger.info(f"爬取URL: {current_url}，深度: {depth}")
-            print(f"\n{Color.BLUE}爬取: {current_url} (深度: {depth}){Color.RESET}")
+    async def _crawl_async(self, url: str, max_depth: int) -> Tuple[List[Dict], int]:
+        """在单个事件循环中完成整次爬取，返回 (检测结果, 处理的URL数)
+
+        外部JS放入先进先出的工作队列，同时进行的下载数不超过_ASYNC_FETCH_LIMIT；
+        任一脚本处理完成后立即补充新的下载，不必等待同一深度的其他脚本。
+        深度未达上限时，继续提取JS中以字符串形式出现的<script src>（如document.write注入的脚本），
+        以下一深度加入队列。HTML解析放到线程中执行，不阻塞事件循环。
+        """
+        results: List[Dict] = []
+        visited: Set[str] = {self._canonical_url(url)}  # 规范化后的URL，避免同一资源因写法不同被重复下载
+        async with self._async_fetcher() as fetch:
+            self.logger.info("爬取URL: %s，深度: 1", url)
+            html = await fetch(url, "页面")
+            if html is None:
+                return results, len(visited)
+
+            js_code, script_srcs = await asyncio.to_thread(self._extract_scripts, html)
+            if js_code:
+                self.logger.debug("从 %s 提取内联JS代码，长度: %s", url, len(js_code))
+                results.extend(self.detect_in_code(js_code, f"内联JS: {url}"))
+            self.logger.debug("在 %s 中找到 %s 个外部JS链接", url, len(script_srcs))
+
+            frontier = deque((js_url, 1) for js_url in self._collect_script_urls(url, script_srcs, visited))
+            pending: Set[asyncio.Task] = set()
+            while frontier or pending:
+                while frontier and len(pending) < self._ASYNC_FETCH_LIMIT:
+                    js_url, depth = frontier.popleft()
+                    pending.add(asyncio.create_task(self._fetch_and_parse(fetch, js_url, depth, max_depth, visited)))
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    js_results, nested = task.result()
+                    results.extend(js_results)
+                    frontier.extend(nested)
+        return results, len(visited)
+
+    async def _fetch_and_parse(self, fetch, js_url: str, depth: int, max_depth: int,
+                               visited: Set[str]) -> Tuple[List[Dict], List[Tuple[str, int]]]:
+        """下载并检测单个外部JS，返回 (检测结果, 待爬取的嵌套JS [(URL, 深度)])"""
+        js_content = await fetch(js_url, "JS")
+        if js_content is None:
+            return [], []
+        js_results: List[Dict] = []
+        try:
+            js_results = self._detect_js_cached(js_content, f"外部JS: {js_url}")
+            if depth >= max_depth:
+                return js_results, []
+            _, nested_srcs = await asyncio.to_thread(self._extract_scripts, js_content)
+            nested_urls = self._collect_script_urls(js_url, nested_srcs, visited)
+        except Exception as e:
+            # 单个脚本处理失败只影响该脚本，不中断整次爬取
+            self.print_color(f"⚠️ 处理JS失败 {js_url}: {str(e)}", Color.YELLOW)
+            self.logger.warning("处理JS失败 %s: %s", js_url, e, exc_info=True)
+            return js_results, []
+        if nested_urls:
+            self.logger.info("在 %s 中发现 %s 个嵌套外部JS，深度: %s", js_url, len(nested_urls), depth + 1)
+        return js_results, [(nested_url, depth + 1) for nested_url in nested_urls]
+
+    def _detect_js_cached(self, js_content: bytes, source: str) -> List[Dict]:
+        """按内容哈希复用检测结果：内容相同的JS直接复制已有结果并替换来源"""
+        digest = hashlib.sha1(js_content).hexdigest()
+        cached = self._content_cache.get(digest)
+        if cached is not None:
+            self.logger.debug("JS内容与已检测的脚本相同，复用检测结果: %s", source)
+            source = sys.intern(source)
+            return [{**res, "source": source} for res in cached]
+        results = self.detect_in_code(js_content, source)
+        self._content_cache[digest] = results
+        return results
+
+    def _collect_script_urls(self, base_url: str, script_srcs: List[str], visited: Set[str]) -> List[str]:
+        """将<script src>解析为绝对地址，保留未访问过的.js链接并以规范化形式登记为已访问
 
+        判断.js扩展名时只看路径部分，带版本号等查询参数的脚本（a.js?v=2）同样会被爬取。
+        无法解析的地址（如 http://[bad/x.js）跳过，不影响同一页面的其他脚本。
+        """
+        js_urls = []
+        for js_src in script_srcs:
             try:
-                response = self.session.get(current_url, timeout=10)
+                js_url = requests.compat.urljoin(base_url, js_src).split('#', 1)[0]
+                canonical = self._canonical_url(js_url)
+            except ValueError as e:
+                self.logger.warning("跳过无效的脚本地址 %s: %s", js_src, e)
+                continue
+            if urlsplit(canonical).path.endswith('.js') and canonical not in visited:
+                visited.add(canonical)
+                js_urls.append(js_url)
+        return js_urls
+
+    @classmethod
+    def _canonical_url(cls, url: str) -> str:
+        """URL规范化：协议与主机名转小写，去掉片段与防缓存查询参数"""
+        parts = urlsplit(url)
+        query = urlencode([(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                           if k not in cls._CACHE_BUST_PARAMS])
+        return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, query, ''))
+
+    @contextlib.asynccontextmanager
+    async def _async_fetcher(self):
+        """提供 fetch(url, kind) 协程函数，下载失败时返回None
+
+        安装了httpx时使用异步客户端（HTTP/2下同域请求复用一条连接多路并发）；
+        否则在线程池中调用requests，复用session的连接池与重试配置。
+        """
+        if httpx is not None:
+            limit = self._ASYNC_FETCH_LIMIT
+            transport = httpx.AsyncHTTPTransport(
+                http2=_HTTP2_ENABLED,
+                retries=3,  # 仅重试连接错误；429/5xx状态码的重试见_fetch_url_async
+                limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit)
+            )
+            # 信号量将同时进行的请求限制在连接池大小以内：请求过多时排队等待信号量，
+            # 而不是在连接池中等待空闲连接（后者计入超时，会把排在后面的请求判为超时失败）
+            semaphore = asyncio.Semaphore(limit)
+            async with httpx.AsyncClient(transport=transport, headers={"User-Agent": self._USER_AGENT},
+                                         timeout=10.0, follow_redirects=True) as client:
+                yield lambda url, kind: self._fetch_url_async(client, url, kind, semaphore)
+        else:
+            loop = asyncio.get_running_loop()
+            with ThreadPoolExecutor(max_workers=self._CRAWL_WORKERS) as executor:
+                yield lambda url, kind: loop.run_in_executor(executor, self._fetch_url, url, kind)
+
+    def _fetch_url(self, url: str, kind: str) -> Optional[bytes]:
+        """使用requests下载单个页面或JS（在线程池中执行），返回原始字节"""
+        try:
+            self.logger.debug("尝试爬取%s: %s", kind, url)
+            # requests_cache自带持久化缓存与条件请求，此时不再叠加会话内缓存
+            use_cache = requests_cache is None
+            cached = self._get_fetched(url) if use_cache else None
+            with self.session.get(url, timeout=10, stream=True,
+                                  headers=self._conditional_headers(cached)) as response:
+                if cached is not None and response.status_code == 304:
+                    self.logger.debug("%s未修改，使用缓存内容: %s", kind, url)
+                    return cached[2]
                 response.raise_for_status()
-                html = response.text
-                self.logger.debug(f"成功爬取 {current_url}，状态码: {response.status_code}")
-
-                js_code = self._extract_js_from_html(html)
-                if js_code:
-                    self.logger.debug(f"从 {current_url} 提取内联JS代码，长度: {len(js_code)}")
-                    inline_results = self.detect_in_code(js_code, f"内联JS: {current_url}")
-                    results.extend(inline_results)
-
-                soup = BeautifulSoup(html, 'html.parser')
-                script_tags = soup.find_all('script', src=True)
-                self.logger.debug(f"在 {current_url} 中找到 {len(script_tags)} 个外部JS链接")
-
-                for tag in script_tags:
-                    js_src = tag['src']
-                    js_url = requests.compat.urljoin(current_url, js_src)
-                    if js_url.endswith('.js') and js_url not in visited:
-                        try:
-                            self.logger.debug(f"尝试爬取外部JS: {js_url}")
-                            js_response = self.session.get(js_url, timeout=10)
-                            js_response.raise_for_status()
-                            js_content = js_response.text
-                            self.logger.debug(f"成功爬取外部JS: {js_url}")
-                            
-                            js_results = self.detect_in_code(js_content, f"外部JS: {js_url}")
-                            results.extend(js_results)
-                            
-                            _crawl(js_url, depth + 1)
-                        except Exception as e:
-                            self.print_color(f"⚠️ 爬取JS失败 {js_url}: {str(e)}", Color.YELLOW)
-                            self.logger.warning(f"爬取JS失败 {js_url}: {str(e)}")
-
+                # 分块读取并限制总大小，只保留一份原始字节，不再额外解码为str（也不触发chardet编码探测）
+                content = self._read_capped(response.iter_content(self._FETCH_CHUNK_SIZE), url)
+            if use_cache:
+                self._store_fetched(url, response.headers, content)
+            self.logger.debug("成功爬取%s: %s，状态码: %s，大小: %s 字节", kind, url, response.status_code, len(content))
+            return content
+        except Exception as e:
+            self.print_color(f"⚠️ 爬取{kind}失败 {url}: {str(e)}", Color.YELLOW)
+            self.logger.warning("爬取%s失败 %s: %s", kind, url, e)
+            return None
+
+    def _retry_delay(self, status_code: int, retry_after: str, attempt: int) -> float:
+        """httpx重试前的等待时间，与requests（urllib3 Retry）保持一致：
+        429/503等状态码带Retry-After时按其等待，否则首次重试立即进行，之后按backoff_factor指数退避
+        """
+        retry = self._retry
+        if retry_after and retry.respect_retry_after_header and status_code in Retry.RETRY_AFTER_STATUS_CODES:
+            try:
+                return retry.parse_retry_after(retry_after)
             except Exception as e:
-                self.print_color(f"⚠️ 爬取页面失败 {current_url}: {str(e)}", Color.YELLOW)
-                self.logger.warning(f"爬取页面失败 {current_url}: {str(e)}")
+                self.logger.debug("无法解析Retry-After: %s: %s", retry_after, e)
+        if attempt == 0:
+            return 0.0
+        return min(retry.backoff_max, retry.backoff_factor * (2 ** attempt))
 
-        _crawl(url, depth=1)
-        self.print_color(f"✅ 爬取完成，共处理 {len(visited)} 个URL", Color.GREEN)
-        self.logger.info(f"爬取完成，共处理 {len(visited)} 个URL，发现 {len(results)} 处匹配")
-        return results
+    @staticmethod
+    def _conditional_headers(cached: Optional[Tuple[Optional[str], Optional[str], bytes]]) -> Dict[str, str]:
+        """根据缓存的校验信息构造条件请求头"""
+        if cached is None:
+            return {}
+        etag, last_modified, _ = cached
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def _get_fetched(self, url: str) -> Optional[Tuple[Optional[str], Optional[str], bytes]]:
+        """读取URL的缓存响应，命中时移到最近使用的位置"""
+        with self._fetch_cache_lock:
+            cached = self._fetch_cache.pop(url, None)
+            if cached is not None:
+                self._fetch_cache[url] = cached
+            return cached
+
+    def _store_fetched(self, url: str, headers, content: bytes) -> None:
+        """缓存带校验信息的响应，条目数或总字节数超出上限时淘汰最久未使用的URL"""
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        cacheable = (etag or last_modified) and len(content) <= self._FETCH_CACHE_ENTRY_BYTES
+        with self._fetch_cache_lock:
+            old = self._fetch_cache.pop(url, None)  # 旧内容已失效，无论新响应是否缓存都先移除
+            if old is not None:
+                self._fetch_cache_bytes -= len(old[2])
+            if not cacheable:
+                return
+            while self._fetch_cache and (len(self._fetch_cache) >= self._FETCH_CACHE_SIZE or
+                                         self._fetch_cache_bytes + len(content) > self._FETCH_CACHE_BYTES):
+                _, _, evicted = self._fetch_cache.pop(next(iter(self._fetch_cache)))
+                self._fetch_cache_bytes -= len(evicted)
+            self._fetch_cache[url] = (etag, last_modified, content)
+            self._fetch_cache_bytes += len(content)
+
+    def _read_capped(self, chunks: Iterator[bytes], url: str) -> bytes:
+        """拼接下载分块，累计超过_MAX_FETCH_BYTES时截断并停止读取"""
+        parts = []
+        total = 0
+        for chunk in chunks:
+            total += len(chunk)
+            if total > self._MAX_FETCH_BYTES:
+                parts.append(chunk[:len(chunk) - (total - self._MAX_FETCH_BYTES)])
+                self._warn_truncated(url)
+                break
+            parts.append(chunk)
+        return b"".join(parts)
+
+    def _warn_truncated(self, url: str) -> None:
+        self.print_color(f"⚠️ 响应超过 {self._MAX_FETCH_BYTES // (1024 * 1024)} MiB，仅检测前 {self._MAX_FETCH_BYTES // (1024 * 1024)} MiB: {url}", Color.YELLOW)
+        self.logger.warning("响应超过 %s 字节，已截断: %s", self._MAX_FETCH_BYTES, url)
+
+    async def _fetch_url_async(self, client, url: str, kind: str, semaphore: asyncio.Semaphore) -> Optional[bytes]:
+        """使用httpx异步下载单个页面或JS，返回原始字节"""
+        try:
+            self.logger.debug("尝试爬取%s: %s", kind, url)
+            cached = self._get_fetched(url)
+            retry = self._retry
+            for attempt in range(retry.total + 1):
+                async with semaphore:
+                    async with client.stream("GET", url, headers=self._conditional_headers(cached)) as response:
+                        retry_after = None
+                        if response.status_code in retry.status_forcelist and attempt < retry.total:
+                            retry_after = response.headers.get("Retry-After", "")
+                        else:
+                            if cached is not None and response.status_code == 304:
+                                self.logger.debug("%s未修改，使用缓存内容: %s", kind, url)
+                                return cached[2]
+                            response.raise_for_status()
+                            chunks = []
+                            total = 0
+                            async for chunk in response.aiter_bytes(self._FETCH_CHUNK_SIZE):
+                                total += len(chunk)
+                                if total > self._MAX_FETCH_BYTES:
+                                    chunks.append(chunk[:len(chunk) - (total - self._MAX_FETCH_BYTES)])
+                                    self._warn_truncated(url)
+                                    break
+                                chunks.append(chunk)
+                if retry_after is None:
+                    break
+                # 在信号量之外等待，退避期间不占用并发名额
+                delay = self._retry_delay(response.status_code, retry_after, attempt)
+                self.logger.debug("%s返回状态码 %s，%.1f 秒后第 %s 次重试: %s",
+                                  kind, response.status_code, delay, attempt + 1, url)
+                await asyncio.sleep(delay)
+            content = b"".join(chunks)
+            self._store_fetched(url, response.headers, content)
+            self.logger.debug("成功爬取%s: %s，大小: %s 字节，协议: %s", kind, url, len(content), response.http_version)
+            return content
+        except Exception as e:
+            self.print_color(f"⚠️ 爬取{kind}失败 {url}: {str(e)}", Color.YELLOW)
+            self.logger.warning("爬取%s失败 %s: %s", kind, url, e)
+            return None
 
     # ------------------------------
     # 结果展示
@@ -791,28 +1829,20 @@ class JSEncryptionDetector:
     def display_results(self, results: List[Dict]) -> None:
         """用表格展示检测结果并更新当前结果列表"""
         self.current_detection_results = results
-        self.logger.info(f"展示检测结果，共 {len(results)} 条记录")
+        self.logger.info("展示检测结果，共 %s 条记录", len(results))
         
         if not results:
             self.print_panel("结果", "未检测到加密算法")
             return
 
-        grouped = {}
+        grouped: Dict[str, List[Dict]] = defaultdict(list)
         for res in results:
-            alg = res["algorithm"]
-            if alg not in grouped:
-                grouped[alg] = []
-            grouped[alg].append(res)
+            grouped[res["algorithm"]].append(res)
 
         for alg, items in grouped.items():
             headers = ["来源", "行号", "匹配内容"]
-            rows = []
-            for item in items:
-                rows.append([
-                    item["source"],
-                    str(item["line"]),
-                    item["match"]
-                ])
+            # print_table需先遍历一遍计算列宽，行数据只能是列表
+            rows = [[item["source"], str(item["line"]), item["match"]] for item in items]
             self.print_table(headers, rows, title=f"{Color.MAGENTA}{alg} 算法 (共 {len(items)} 处){Color.RESET}")
 
             if self.confirm(f"是否查看 {alg} 的匹配上下文？"):
@@ -832,7 +1862,7 @@ class JSEncryptionDetector:
         """主菜单交互逻辑"""
         self.logger.info("程序启动，显示主菜单")
         while True:
-            os.system('cls' if os.name == 'nt' else 'clear')
+            self._clear_screen()
             self.print_panel(
                 "主菜单",
                 (f"{Color.GREEN}JS加密算法检测器{Color.RESET}\n"
@@ -870,22 +1900,23 @@ class JSEncryptionDetector:
                     time.sleep(1)
             except Exception as e:
                 self.print_color(f"❌ 操作失败: {str(e)}", Color.RED)
-                self.logger.error(f"操作失败: {str(e)}", exc_info=True)
+                self.logger.error("操作失败: %s", e, exc_info=True)
                 input("按回车继续...")
 
     def _handle_local_file(self) -> None:
         """处理本地文件检测"""
         file_path = self.prompt_input("请输入文件路径", "test.js")
-        self.logger.info(f"用户选择检测本地文件: {file_path}")
+        self.logger.info("用户选择检测本地文件: %s", file_path)
+        first_match_only = self.confirm("是否使用快速模式（每种算法只报告首处命中）？", default=False)
         print("正在检测...")
-        results = self.detect_local_file(file_path)
+        results = self.detect_local_file(file_path, first_match_only)
         self.display_results(results)
         input("按回车返回主菜单...")
 
     def _handle_directory(self) -> None:
         """处理目录检测"""
         dir_path = self.prompt_input("请输入目录路径", "./")
-        self.logger.info(f"用户选择检测目录: {dir_path}")
+        self.logger.info("用户选择检测目录: %s", dir_path)
         results = self.detect_directory(dir_path)
         self.display_results(results)
         input("按回车返回主菜单...")
@@ -893,7 +1924,7 @@ class JSEncryptionDetector:
     def _handle_crawl(self) -> None:
         """处理网页爬取检测"""
         url = self.prompt_input("请输入网页URL", "https://example.com")
-        self.logger.info(f"用户选择爬取网页: {url}")
+        self.logger.info("用户选择爬取网页: %s", url)
         max_depth = 1
         while True:
             try:
@@ -914,7 +1945,7 @@ class JSEncryptionDetector:
         """特征库管理子菜单"""
         self.logger.info("进入特征库管理菜单")
         while True:
-            os.system('cls' if os.name == 'nt' else 'clear')
+            self._clear_screen()
             self.show_loaded_rules()
             self.print_panel("特征库管理", "")
             
@@ -953,18 +1984,133 @@ class JSEncryptionDetector:
                     self.print_color("❌ 无效选择，请重试", Color.RED)
             except Exception as e:
                 self.print_color(f"❌ 操作失败: {str(e)}", Color.RED)
-                self.logger.error(f"特征库管理操作失败: {str(e)}", exc_info=True)
+                self.logger.error("特征库管理操作失败: %s", e, exc_info=True)
 
             input("按回车继续...")
 
 
+# ------------------------------
+# 命中收集热循环
+# 提到模块级并只读写局部变量，循环体内不再有self属性查找，解释器的字节码特化更稳定
+# ------------------------------
+def _collect_union_matches(matches: Iterator[Match], group_alg: Dict[str, str],
+                           followers: Dict[str, List[Tuple[str, List[Pattern]]]],
+                           cleaned_code: Union[str, bytes], source: str, newline_offsets: List[int],
+                           seen: Set[Tuple[str, int]], out: List[Dict],
+                           remaining: Optional[Set[str]] = None) -> int:
+    """收集合并正则的命中：通过分组名还原算法，同一算法同一行只记录首次命中，返回命中总数
+
+    followers 为 算法名 -> 合并正则中排在其后的 [(算法名, 特征正则)]，用于补充同一位置上其他算法的命中。
+    remaining 不为None时只记录其中各算法的首次命中（记录后移出集合），集合为空即停止扫描。
+    """
+    bisect_left = bisect.bisect_left
+    get_context = JSEncryptionDetector._get_context
+    to_text = JSEncryptionDetector._to_text
+    seen_add = seen.add
+    append = out.append
+    contexts: Dict[int, str] = {}  # 行号 -> 上下文，同一行被多个算法命中时只切片一次
+    match_count = 0
+    for match in matches:
+        match_count += 1
+        group = match.lastgroup
+        alg_name = group_alg[group]
+        pos = match.start()
+        line_num = bisect_left(newline_offsets, pos) + 1
+        hits = [(alg_name, match.group(group))]
+        for other_alg, patterns in followers[alg_name]:
+            if (other_alg, line_num) in seen or (remaining is not None and other_alg not in remaining):
+                continue
+            for pattern in patterns:
+                other = pattern.match(cleaned_code, pos)
+                if other is not None:
+                    hits.append((other_alg, other.group()))
+                    break
+        for alg_name, text in hits:
+            if remaining is not None:
+                if alg_name not in remaining:
+                    continue
+                remaining.discard(alg_name)
+            key = (alg_name, line_num)
+            if key in seen:
+                continue
+            seen_add(key)
+            context = contexts.get(line_num)
+            if context is None:
+                context = contexts[line_num] = get_context(cleaned_code, newline_offsets, line_num)
+            append({
+                "algorithm": alg_name,
+                "source": source,
+                "line": line_num,
+                "match": to_text(text),
+                "context": context
+            })
+        if remaining is not None and not remaining:
+            break
+    return match_count
+
+
+def _collect_pattern_matches(matches: Iterator[Match], alg_name: str,
+                             cleaned_code: Union[str, bytes], source: str, newline_offsets: List[int],
+                             seen: Set[Tuple[str, int]], out: List[Dict], contexts: Dict[int, str]) -> int:
+    """收集单个特征正则的命中，同一算法同一行只记录首次命中，返回命中总数
+
+    contexts 为 行号 -> 上下文 的缓存，由调用方在同一份代码的各特征之间共享。
+    """
+    bisect_left = bisect.bisect_left
+    get_context = JSEncryptionDetector._get_context
+    to_text = JSEncryptionDetector._to_text
+    seen_add = seen.add
+    append = out.append
+    match_count = 0
+    for match in matches:
+        match_count += 1
+        line_num = bisect_left(newline_offsets, match.start()) + 1
+        key = (alg_name, line_num)
+        if key in seen:
+            continue
+        seen_add(key)
+        context = contexts.get(line_num)
+        if context is None:
+            context = contexts[line_num] = get_context(cleaned_code, newline_offsets, line_num)
+        append({
+            "algorithm": alg_name,
+            "source": source,
+            "line": line_num,
+            "match": to_text(match.group()),
+            "context": context
+        })
+    return match_count
+
+
+# ------------------------------
+# 目录检测工作进程
+# ------------------------------
+_worker_detector: Optional[JSEncryptionDetector] = None
+
+
+def _init_scan_worker(algorithms: Dict[str, List[str]], regex_engine: str,
+                      log_queue: Optional["multiprocessing.Queue"] = None) -> None:
+    """工作进程初始化：用主进程的特征库与正则引擎构建检测器，规则只编译一次，日志发往主进程"""
+    global _worker_detector
+    _worker_detector = JSEncryptionDetector(algorithms=algorithms, regex_engine=regex_engine, log_queue=log_queue)
+
+
+def _scan_one_file(file_path: str) -> List[Dict]:
+    """在工作进程中检测单个文件（模块级函数，便于进程池序列化）"""
+    return _worker_detector.detect_local_file(file_path)
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JS加密算法检测器")
+    parser.add_argument("--regex-engine", choices=JSEncryptionDetector.REGEX_ENGINES, default="auto",
+                        help="多模式扫描引擎（默认auto：已安装hyperscan时使用hyperscan，否则使用re）")
+    args = parser.parse_args()
     try:
-        detector = JSEncryptionDetector()
+        detector = JSEncryptionDetector(regex_engine=args.regex_engine)
         detector.main_menu()
     except KeyboardInterrupt:
         print(f"\n{Color.YELLOW}⚠️ 程序被中断{Color.RESET}")
         logging.error("程序被用户中断")
     except Exception as e:
         print(f"{Color.RED}❌ 程序出错: {str(e)}{Color.RESET}")
-        logging.critical(f"程序出错: {str(e)}", exc_info=True)
\ No newline at end of file
+        logging.critical("程序出错: %s", e, exc_info=True)
\ No newline at end of file
@@ -0,0 +1,423 @@
+# -*- coding: utf-8 -*-
+"""js_eyes_scan_v2 的回归测试（python -m unittest discover tests）"""
+
+import logging
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import js_eyes_scan_v2 as scanner  # noqa: E402
+
+_ORIG_CWD = os.getcwd()
+_TMP_DIR = tempfile.TemporaryDirectory()
+
+
+def setUpModule():
+    os.chdir(_TMP_DIR.name)  # debug.log写到临时目录
+
+
+def tearDownModule():
+    os.chdir(_ORIG_CWD)
+
+
+def _engines():
+    """当前环境可用的扫描引擎组合：(说明, regex_engine, 是否禁用regex模块)"""
+    engines = [("re+regex", "re", False), ("re", "re", True)]
+    if scanner.hyperscan is not None:
+        engines.append(("hyperscan", "hyperscan", False))
+    return engines
+
+
+def _algorithms(rules, code, regex_engine="re", no_regex=False):
+    with mock.patch.object(scanner, "regex", None if no_regex else scanner.regex):
+        detector = scanner.JSEncryptionDetector(algorithms=rules, regex_engine=regex_engine)
+        return sorted({res["algorithm"] for res in detector.detect_in_code(code, "test")})
+
+
+class OverlappingRulesTest(unittest.TestCase):
+    RULES = {"SHA-256": [r"\bsha256\b"], "SHA-family": [r"\bsha\d+"]}
+
+    def test_all_algorithms_matching_at_same_offset_are_reported(self):
+        for name, engine, no_regex in _engines():
+            for code in ("sha256(data)", b"sha256(data)"):
+                with self.subTest(engine=name, code=code):
+                    self.assertEqual(_algorithms(self.RULES, code, engine, no_regex), ["SHA-256", "SHA-family"])
+
+
+class CustomRuleUnionTest(unittest.TestCase):
+    CASES = [
+        ({"A": [r"(?P<q>x)y"], "B": [r"(?P<q>x)z"]}, "xy; xz", ["A", "B"]),
+        ({"A": [r"""(?P<q>['"])key(?P=q)"""], "B": [r"""(?P<q>['"])iv(?P=q)"""]}, "o['key'] = o[\"iv\"];", ["A", "B"]),
+        ({"A": [r"""(?P<q>['"])key(?P=q)"""], "B": [r"\bsalt\b"]}, "o['key'] = salt;", ["A", "B"]),
+        ({"A": [r"(?P<a1_0>k)ey"], "B": [r"\bsalt\b"]}, "key + salt", ["A", "B"]),  # 与外层分组名相同
+    ]
+
+    def test_named_groups_in_rules(self):
+        for name, engine, no_regex in _engines():
+            for rules, code, expected in self.CASES:
+                with self.subTest(engine=name, rules=rules):
+                    self.assertEqual(_algorithms(rules, code, engine, no_regex), expected)
+
+
+class WindowedScanTest(unittest.TestCase):
+    RULES = {"MD5": [r"\bmd5\b"], "SHA-1": [r"\bsha1\("]}
+
+    def test_windowed_scan_matches_full_scan(self):
+        code = "".join(f"{'x' * (i % 37)} md5(a) y=sha1(b);\n" for i in range(400))
+        for name, engine, no_regex in _engines():
+            if engine == "hyperscan":
+                continue  # Hyperscan不分段
+            with self.subTest(engine=name), mock.patch.object(scanner, "regex", None if no_regex else scanner.regex):
+                detector = scanner.JSEncryptionDetector(algorithms=self.RULES, regex_engine=engine)
+                expected = [(res["algorithm"], res["line"]) for res in detector.detect_in_code(code, "test")]
+                with mock.patch.multiple(scanner.JSEncryptionDetector, _MAX_SCAN_CHARS=1000,
+                                         _SCAN_WINDOW=256, _WINDOW_OVERLAP=64):
+                    windowed = [(res["algorithm"], res["line"]) for res in detector.detect_in_code(code, "test")]
+                self.assertEqual(len(expected), 800)
+                self.assertEqual(windowed, expected)
+
+
+class NonAsciiInputTest(unittest.TestCase):
+    RULES = {"MD5": [r"\bmd5\b"], "SHA-1": [r"\bsha1\b"]}
+    CODE = "var 中md5 = 1;\nvar ésha1=2;\nmd5(x);\n"
+
+    def test_bytes_input_matches_text_semantics(self):
+        detector = scanner.JSEncryptionDetector(algorithms=self.RULES, regex_engine="re")
+        text_results = detector.detect_in_code(self.CODE, "test")
+        self.assertEqual([(res["algorithm"], res["line"]) for res in text_results], [("MD5", 3)])
+        self.assertEqual(detector.detect_in_code(self.CODE.encode("utf-8"), "test"), text_results)
+
+    def test_mapped_file_matches_text_semantics(self):
+        detector = scanner.JSEncryptionDetector(algorithms=self.RULES, regex_engine="re")
+        with tempfile.NamedTemporaryFile("w", suffix=".js", encoding="utf-8", delete=False) as f:
+            f.write(self.CODE * 50000)  # 超过mmap阈值
+        try:
+            results = detector.detect_local_file(f.name)
+        finally:
+            os.remove(f.name)
+        self.assertEqual({res["algorithm"] for res in results}, {"MD5"})
+
+    def test_non_ascii_rules_skip_bytes_mode(self):
+        detector = scanner.JSEncryptionDetector(algorithms={"X": [r"\bsé\b"]}, regex_engine="re")
+        self.assertIsNone(detector._compiled_bytes)
+        self.assertEqual(len(detector.detect_in_code("SÉ".encode("utf-8"), "test")), 1)
+
+
+class EngineParityTest(unittest.TestCase):
+    CODES = [
+        "var 中md5 = 1;\nvar ésha1=2;\n",
+        "x = ſha1(y);\nK = md5(a);\n",
+        "// 注释\nvar s = '中文'; md5(s);\nCryptoJS.AES.encrypt(a, k);\n",
+        "btoa(x)\x1c\nsha256(d)\n",
+    ]
+
+    def test_engines_agree_on_non_ascii_input(self):
+        rules = scanner.JSEncryptionDetector(regex_engine="re").algorithms
+        for code in self.CODES:
+            for as_bytes in (False, True):
+                data = code.encode("utf-8") if as_bytes else code
+                reports = {}
+                for name, engine, no_regex in _engines():
+                    with mock.patch.object(scanner, "regex", None if no_regex else scanner.regex):
+                        detector = scanner.JSEncryptionDetector(algorithms=rules, regex_engine=engine)
+                        reports[name] = sorted((res["algorithm"], res["line"]) for res in detector.detect_in_code(data, "test"))
+                with self.subTest(code=code, as_bytes=as_bytes):
+                    self.assertEqual(len({tuple(report) for report in reports.values()}), 1, reports)
+
+
+class RequiredLiteralsTest(unittest.TestCase):
+    CASES = [
+        # 普通字面量与转义
+        (r"\bmd5\b", {"md5"}),
+        (r"\.encrypt\(", {".encrypt("}),
+        (r"Abcd", {"abcd"}),
+        (r"createHash\s*\(\s*['\"]md5['\"]\s*\)", {"createhash"}),
+        (r"\x41\x42\x43", None),
+        (r"sha\d+", {"sha"}),
+        (r"[abc]defg", {"defg"}),
+        # 可省略的字符与分组
+        (r"abcd?efg", {"abc"}),
+        (r"abcd*efg", {"abc"}),
+        (r"abc{0,3}defg", {"defg"}),
+        (r"a{,}bcdef", {"bcdef"}),
+        (r"(?:crypto)?subtle", {"subtle"}),
+        (r"(crypto)?subtle\.digest", {"subtle.digest"}),
+        (r"(?:md5|sha1)?xyz", {"xyz"}),
+        (r"(?:aes)+", {"aes"}),
+        # 不构成量词的 { 是字面量，其后的 | 仍是顶层分支
+        (r"abcd{x|efgh", None),
+        # 分支
+        (r"md5|sha1", None),
+        (r"(?:md5|sha1)", {"md5", "sha1"}),
+        (r"\b(atob|btoa)\b", {"atob", "btoa"}),
+        (r"(?P<n>aes|des)x", {"aes", "des"}),
+        (r"(a(b)c)defg", {"defg"}),
+        # 内联标志、前瞻与注释
+        (r"(?i)encrypt", {"encrypt"}),
+        (r"(?x) md5", None),
+        (r"(?x:a b)cdef", None),
+        (r"(?=crypto)crypto", {"crypto"}),
+        (r"encrypt(?#comment)", {"encrypt"}),
+        # 过短或括号不匹配
+        (r"\bsé\b", None),
+        (r"ab)c", None),
+    ]
+
+    def test_required_literals(self):
+        for pattern, expected in self.CASES:
+            with self.subTest(pattern=pattern):
+                self.assertEqual(scanner.JSEncryptionDetector._required_literals(pattern), expected)
+
+    def test_literals_hold_for_matching_text(self):
+        import re
+        samples = ["md5(", "x.encrypt(", "createHash ( 'md5' )", "sha256", "subtle.digest", "abcdddefg",
+                   "abefgh", "(?x) md5", "bcdef", "cryptocrypto", "atob(", "ENCRYPT"]
+        for pattern, expected in self.CASES:
+            if expected is None:
+                continue
+            for text in samples:
+                if re.search(pattern, text, re.IGNORECASE):
+                    with self.subTest(pattern=pattern, text=text):
+                        self.assertTrue(any(literal in text.lower() for literal in expected))
+
+    def test_non_ascii_literals_disable_prefilter(self):
+        detector = scanner.JSEncryptionDetector(algorithms={"X": [r"\bsécurité\b"]}, regex_engine="re")
+        self.assertIsNone(detector._alg_literals["X"])
+
+    def test_prefilter_follows_unicode_ignorecase(self):
+        detector = scanner.JSEncryptionDetector(
+            algorithms={"SHA-1": [r"\bsha1\b"], "AES": [r"createCipher\s*\("]}, regex_engine="re"
+        )
+        for code, expected in [("x = ſha1(y)", {"SHA-1"}), ("createcİpher(k)", {"AES"}),
+                               ("createcıpher(k)", {"AES"}), ("SHA1 中", {"SHA-1"})]:
+            with self.subTest(code=code):
+                self.assertEqual({res["algorithm"] for res in detector.detect_in_code(code, "test")}, expected)
+
+
+class NewlineOffsetsTest(unittest.TestCase):
+    CODES = [
+        "",
+        "a=1;" * 100000,  # 换行稀少的压缩代码
+        ("中文x" * 10 + "\n") * 5000,  # 非ASCII
+        ("x" * 20 + "\n") * 20000,  # 行短且密集
+    ]
+
+    @staticmethod
+    def _find_offsets(code):
+        newline = "\n" if isinstance(code, str) else b"\n"
+        return [i for i in range(len(code)) if code[i:i + 1] == newline]
+
+    def test_offsets_match_plain_scan(self):
+        for code in self.CODES:
+            for data in (code, code.encode("utf-8")):
+                with self.subTest(kind=type(data).__name__, size=len(data)):
+                    self.assertEqual(scanner.JSEncryptionDetector._get_newline_offsets(data), self._find_offsets(data))
+
+    def test_numpy_only_for_dense_ascii_input(self):
+        prefer = scanner.JSEncryptionDetector._prefer_numpy_offsets
+        self.assertFalse(prefer(self.CODES[1]))
+        self.assertFalse(prefer(self.CODES[2]))
+        self.assertTrue(prefer(self.CODES[3]))
+        self.assertTrue(prefer(self.CODES[3].encode("ascii")))
+
+
+class ScriptExtractionTest(unittest.TestCase):
+    HTML = ('<html><head><script>init()</script></head><body>'
+            '<template id="t" data-x="a>b"><div><script src="tpl.js">md5(x)</script></div>'
+            '<template><script>sha1(y)</script></template></template>'
+            '<script src="app.js"></script></body></html>')
+
+    def test_template_scripts_match_beautifulsoup(self):
+        with mock.patch.object(scanner, "LexborHTMLParser", None):
+            expected = scanner.JSEncryptionDetector._extract_scripts(self.HTML)
+        self.assertEqual(expected, ("init()\nmd5(x)\nsha1(y)", ["tpl.js", "app.js"]))
+        if scanner.LexborHTMLParser is not None:
+            self.assertEqual(scanner.JSEncryptionDetector._extract_scripts(self.HTML), expected)
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class WorkerLoggingTest(unittest.TestCase):
+    def test_worker_logs_reach_parent_handlers(self):
+        files = []
+        for i in range(4):
+            path = os.path.join(_TMP_DIR.name, f"worker_{i}.js")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("var h = md5(pwd);\n")
+            files.append(path)
+        detector = scanner.JSEncryptionDetector(algorithms={"MD5": [r"\bmd5\b"]}, regex_engine="re")
+        capture = _ListHandler()
+        detector.logger.addHandler(capture)
+        try:
+            results = detector._detect_files_parallel(files)
+        finally:
+            detector.logger.removeHandler(capture)
+        self.assertEqual(len(results), 4)
+        worker_records = [record for record in capture.records if record.process != os.getpid()]
+        messages = [record.getMessage() for record in worker_records]
+        self.assertEqual(sorted(m for m in messages if m.startswith("开始检测本地文件")),
+                         [f"开始检测本地文件: {path}" for path in files])
+        self.assertNotIn("日志系统初始化完成", messages)
+
+
+class ScanOnlyWorkerTest(unittest.TestCase):
+    def test_local_scan_does_not_create_http_session(self):
+        path = os.path.join(_TMP_DIR.name, "scan_only.js")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("var h = md5(pwd);\n")
+        scanner._init_scan_worker({"MD5": [r"\bmd5\b"]}, "re")
+        try:
+            self.assertEqual([res["algorithm"] for res in scanner._scan_one_file(path)], ["MD5"])
+            self.assertIsNone(scanner._worker_detector._session)
+        finally:
+            scanner._worker_detector = None
+
+
+class _FlakyHandler(BaseHTTPRequestHandler):
+    """/page.html引用/flaky.js；flaky.js第一次请求返回503（Retry-After: 0），之后返回含md5的脚本。
+    /bad.html与/good.js含无法解析的<script src>，用于验证单个地址出错不影响其他结果；
+    /nested.html -> /loader.js -> /deep.js 为嵌套注入的脚本；/etag.js带ETag，条件请求命中时返回304"""
+    hits = {}
+
+    def do_GET(self):
+        count = self.hits[self.path] = self.hits.get(self.path, 0) + 1
+        if self.path == "/page.html":
+            self._reply(200, b'<html><script src="/flaky.js"></script></html>')
+        elif self.path == "/bad.html":
+            self._reply(200, b'<html><script>md5(pwd)</script><script src="http://[bad/x.js"></script>'
+                             b'<script src="/good.js"></script></html>')
+        elif self.path == "/nested.html":
+            self._reply(200, b'<html><script src="/loader.js?v=1"></script><script src="/loader.js?v=2"></script></html>')
+        elif self.path.startswith("/loader.js"):
+            self._reply(200, b'document.write(\'<script src="/deep.js"></script>\');')
+        elif self.path == "/deep.js":
+            self._reply(200, b"var k = CryptoJS.DES.encrypt(msg, key);")
+        elif self.path == "/etag.html":
+            self._reply(200, b'<html><script src="/etag.js"></script></html>')
+        elif self.path == "/etag.js" and self.headers.get("If-None-Match") == '"v1"':
+            self.hits["not_modified"] = self.hits.get("not_modified", 0) + 1
+            self._reply(304, b"", {"ETag": '"v1"'})
+        elif self.path == "/etag.js":
+            self._reply(200, b"var h = md5(pwd);", {"ETag": '"v1"'})
+        elif self.path == "/good.js":
+            self._reply(200, b'sha1(x); document.write(\'<script src="http://[bad/y.js"></script>\');')
+        elif self.path == "/flaky.js" and count == 1:
+            self._reply(503, b"busy", {"Retry-After": "0"})
+        elif self.path == "/flaky.js":
+            self._reply(200, b"var h = md5(pwd);")
+        else:
+            self._reply(404, b"")
+
+    def _reply(self, status, body, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FetchCacheTest(unittest.TestCase):
+    HEADERS = {"ETag": '"v1"'}
+
+    def setUp(self):
+        self.detector = scanner.JSEncryptionDetector(algorithms={"MD5": [r"\bmd5\b"]}, regex_engine="re")
+        patcher = mock.patch.multiple(scanner.JSEncryptionDetector, _FETCH_CACHE_BYTES=100, _FETCH_CACHE_ENTRY_BYTES=60)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_evicts_least_recently_used_by_total_bytes(self):
+        store = self.detector._store_fetched
+        store("a", self.HEADERS, b"a" * 40)
+        store("b", self.HEADERS, b"b" * 40)
+        self.assertIsNotNone(self.detector._get_fetched("a"))  # a变为最近使用
+        store("c", self.HEADERS, b"c" * 40)
+        self.assertEqual(list(self.detector._fetch_cache), ["a", "c"])
+        self.assertEqual(self.detector._fetch_cache_bytes, 80)
+
+    def test_skips_oversized_and_unvalidated_bodies(self):
+        store = self.detector._store_fetched
+        store("a", self.HEADERS, b"a" * 40)
+        store("big", self.HEADERS, b"x" * 61)
+        store("a", {}, b"a" * 10)  # 新响应无校验信息，旧缓存失效
+        self.assertEqual(self.detector._fetch_cache, {})
+        self.assertEqual(self.detector._fetch_cache_bytes, 0)
+
+
+class CrawlRetryTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _FlakyHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def _crawl(self, use_httpx, page="page.html", max_depth=1, detector=None):
+        _FlakyHandler.hits = {}
+        with mock.patch.object(scanner, "httpx", scanner.httpx if use_httpx else None), \
+                mock.patch.object(scanner, "requests_cache", None):
+            detector = detector or scanner.JSEncryptionDetector(regex_engine="re")
+            return detector.crawl_and_detect(f"{self.base}/{page}", max_depth)
+
+    def _transports(self):
+        return [False] + ([True] if scanner.httpx is not None else [])
+
+    def test_nested_scripts_follow_depth(self):
+        for use_httpx in self._transports():
+            with self.subTest(httpx=use_httpx):
+                self.assertEqual(self._crawl(use_httpx, "nested.html", 1), [])
+                self.assertEqual(_FlakyHandler.hits.get("/loader.js?v=2"), None)  # 仅防缓存参数不同，视为同一脚本
+                results = self._crawl(use_httpx, "nested.html", 2)
+                self.assertEqual([(res["algorithm"], res["source"]) for res in results],
+                                 [("DES", f"外部JS: {self.base}/deep.js")])
+                self.assertEqual(_FlakyHandler.hits["/deep.js"], 1)
+
+    def test_etag_revalidation_reuses_cached_body(self):
+        for use_httpx in self._transports():
+            with self.subTest(httpx=use_httpx):
+                detector = scanner.JSEncryptionDetector(regex_engine="re")
+                first = self._crawl(use_httpx, "etag.html", detector=detector)
+                second = self._crawl(use_httpx, "etag.html", detector=detector)
+                self.assertEqual({res["algorithm"] for res in first}, {"MD5"})
+                self.assertEqual(second, first)
+                self.assertEqual(_FlakyHandler.hits.get("not_modified"), 1)
+                self.assertIn(f"{self.base}/etag.js", detector._fetch_cache)
+
+    def test_invalid_script_src_is_skipped(self):
+        for use_httpx in self._transports():
+            for max_depth in (1, 2):
+                with self.subTest(httpx=use_httpx, max_depth=max_depth):
+                    results = self._crawl(use_httpx, "bad.html", max_depth)
+                    self.assertEqual({(res["algorithm"], res["source"].split(": ")[0]) for res in results},
+                                     {("MD5", "内联JS"), ("SHA-1", "外部JS")})
+
+    def test_status_retry_on_both_transports(self):
+        for use_httpx in self._transports():
+            with self.subTest(httpx=use_httpx):
+                results = self._crawl(use_httpx)
+                self.assertEqual({res["algorithm"] for res in results}, {"MD5"})
+                self.assertEqual(_FlakyHandler.hits["/flaky.js"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()